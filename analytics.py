@@ -0,0 +1,54 @@
+# analytics.py
+# Session plan to outcome analytics: do the progress entries logged on days whose session plan had
+# a given block (or lead staff) turn out differently from those on the other planned days? The
+# counts come from the trigger-maintained plan_outcomes summary (database.get_plan_outcomes), which
+# joins session_plans to progress by date; this module only turns them into rates with vectorized
+# pandas, so the analysis page never reads the progress table itself.
+from database import get_plan_outcomes
+from instrumentation import instrument_module
+
+COUNTS = ["sessions", "regression", "stable", "progress"]
+ALL_GOALS = "All Goal Areas"
+NO_GOAL = "(No Goal Area)"
+# Comparisons with fewer sessions on either side are flagged as too small to read much into
+MIN_SESSIONS = 10
+
+def _with_rates(df, suffix=""):
+    sessions = df[f"sessions{suffix}"]
+    df[f"progress_rate{suffix}"] = df[f"progress{suffix}"] / sessions
+    df[f"regression_rate{suffix}"] = df[f"regression{suffix}"] / sessions
+    df[f"mean_status{suffix}"] = (df[f"regression{suffix}"] + 2 * df[f"stable{suffix}"]
+                                  + 3 * df[f"progress{suffix}"]) / sessions
+    return df
+
+def load_outcomes(start_date=None, end_date=None, by_goal=True):
+    """Returns the plan outcome counts per feature, per goal area or summed over all goal areas."""
+    outcomes = get_plan_outcomes(start_date, end_date)
+    outcomes["goal_area"] = outcomes["goal_area"].fillna(NO_GOAL)
+    if not by_goal:
+        outcomes = (outcomes.groupby("feature", as_index=False)
+                    .agg(**{c: (c, "sum") for c in COUNTS}, plan_days=("plan_days", "first"))
+                    .assign(goal_area=ALL_GOALS))
+    return outcomes
+
+def compare_features(outcomes, prefix, baseline="any"):
+    """Compares every feature starting with `prefix` ('block:' or 'lead:') with the `baseline` days without it.
+
+    With the default baseline that is the other days that had a session plan; comparing 'any' with
+    'all' contrasts planned with unplanned days. Returns one row per (feature, goal_area) with the
+    counts and rates on both sides, the difference in progress rate and an `enough_data` flag.
+    """
+    selected = outcomes[outcomes["feature"].str.startswith(prefix)]
+    base = outcomes.loc[outcomes["feature"] == baseline, ["goal_area", *COUNTS]]
+    df = selected.merge(base, on="goal_area", how="left", suffixes=("", "_base"))
+    for c in COUNTS:
+        df[f"{c}_without"] = df[f"{c}_base"].fillna(0) - df[c]
+    df = _with_rates(_with_rates(df), "_without")
+    df["progress_rate_difference"] = df["progress_rate"] - df["progress_rate_without"]
+    df["enough_data"] = (df["sessions"] >= MIN_SESSIONS) & (df["sessions_without"] >= MIN_SESSIONS)
+    df["feature"] = df["feature"].str.slice(len(prefix))
+    return (df.drop(columns=[f"{c}_base" for c in COUNTS])
+            .sort_values(["goal_area", "progress_rate_difference"], ascending=[True, False])
+            .reset_index(drop=True))
+
+instrument_module(globals(), "analytics")
@@ -1,11 +1,19 @@
+import importlib
 import streamlit as st
-# UPDATED: Database functions are now imported from the new location (assuming you move database.py to the views folder)
-from views.database import init_db, get_user
-# Import the new admin tools page
-from views import tracker, planner, dashboard, admin_tools 
+# Database functions live in database.py at the project root (the views import it the same way)
+from database import init_db
+from auth import authenticate, issue_session_token, verify_session_token, LoginThrottledError
+import jobs
 
-# Initialize Database
-init_db()
+# Initialize Database once per server process (applies pending schema migrations), not on every rerun,
+# and resume background jobs that were still queued when the server last stopped
+@st.cache_resource(show_spinner=False)
+def _init_database():
+    init_db()
+    jobs.recover()
+    return True
+
+_init_database()
 
 # Page Configuration
 st.set_page_config(page_title="TILP Connect", layout="wide", page_icon="🧩")
@@ -20,14 +28,21 @@ def login_screen():
         password = st.text_input("Password", type="password")
         
         if st.button("Log In"):
-            user_data = get_user(username, password)
+            try:
+                user_data = authenticate(username, password)
+            except LoginThrottledError as e:
+                st.error(str(e))
+                return
             
             if user_data:
                 st.session_state["logged_in"] = True
+                # Signed token lets later reruns trust the session without another database lookup
+                st.session_state["auth_token"] = issue_session_token(user_data)
                 st.session_state["user_role"] = user_data["role"]
                 st.session_state["username"] = user_data["username"]
-                # Store the child link for parent filtering
-                st.session_state["child_link"] = user_data["child_link"]
+                # Store the linked child for parent filtering (None for staff)
+                st.session_state["child_id"] = user_data["child_id"]
+                st.session_state["child_name"] = user_data["child_name"]
                 st.rerun()
             else:
                 st.error("Incorrect username or password")
@@ -41,30 +56,40 @@ def main():
         login_screen()
         return
 
+    # Validate the signed session token (no database access); expired or tampered tokens log out
+    if verify_session_token(st.session_state.get("auth_token")) is None:
+        st.session_state.clear()
+        st.session_state["logged_in"] = False
+        st.rerun()
+
     # --- SIDEBAR NAVIGATION ---
     user_role = st.session_state["user_role"]
     username = st.session_state["username"]
     st.sidebar.title(f"👤 User: {username.capitalize()}")
     st.sidebar.markdown(f"**Role:** {user_role.upper()}")
     
-    # Define available pages based on Role
+    # Define available pages based on Role. Pages are view module names, imported only when opened,
+    # so the login screen and light pages never load plotly or pandas.
     pages = {}
     
     # Admin has all permissions
     if user_role == "admin":
-        pages["🔑 Admin Tools"] = admin_tools.show_page
+        pages["🔑 Admin Tools"] = "admin_tools"
     
     # Staff/Therapists/Admin roles
     if user_role in ["admin", "OT", "SLP", "BC", "ECE", "Assistant", "staff"]:
-        pages["📝 Progress Tracker"] = tracker.show_page
-        pages["📅 Daily Planner"] = planner.show_page
+        pages["📝 Progress Tracker"] = "tracker"
+        pages["📅 Daily Planner"] = "planner"
     
     # Dashboard view changes based on role
     if user_role == "parent":
-        child_name = st.session_state.get("child_link", "My Child")
-        pages[f"📊 My Child's Dashboard"] = dashboard.show_page
+        pages[f"📊 My Child's Dashboard"] = "dashboard"
     else:
-        pages["📊 Dashboard & Reports"] = dashboard.show_page
+        pages["📊 Dashboard & Reports"] = "dashboard"
+        pages["📈 Plan Outcomes"] = "analytics"
+
+    # Search is scoped inside the page (parents only see their child's notes)
+    pages["🔍 Search"] = "search"
 
     selection = st.sidebar.radio("Go to:", list(pages.keys()))
     
@@ -74,7 +99,7 @@ def main():
         st.rerun()
 
     # Display Selected Page
-    pages[selection]()
+    importlib.import_module(f"views.{pages[selection]}").show_page()
 
 if __name__ == "__main__":
     main()
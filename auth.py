@@ -0,0 +1,131 @@
+# auth.py
+# Login for the Streamlit app: password verification off the script thread, an in-memory
+# attempt limiter, and signed session tokens so a logged-in session is not re-checked against
+# SQLite on every rerun.
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from database import get_user_record, set_password_hash
+from passwords import hash_password, verify_password
+
+# Bounded pool: PBKDF2 releases the GIL, so hashes run in parallel without starving other sessions
+HASH_WORKERS = 4
+MAX_ATTEMPTS = 5
+ATTEMPT_WINDOW_SECONDS = 5 * 60
+LOCKOUT_SECONDS = 5 * 60
+SESSION_TTL_SECONDS = 12 * 60 * 60
+
+# Set TILP_SECRET_KEY to keep tokens valid across server restarts (sessions are lost anyway).
+_SECRET_KEY = os.environ.get("TILP_SECRET_KEY", "").encode("utf-8") or os.urandom(32)
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="auth")
+
+class LoginThrottledError(Exception):
+    """Raised when an account has too many recent failed login attempts."""
+
+class LoginRateLimiter:
+    """Counts failed attempts per username in a sliding window and locks the name out when exceeded."""
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, window_seconds=ATTEMPT_WINDOW_SECONDS, lockout_seconds=LOCKOUT_SECONDS):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.lockout_seconds = lockout_seconds
+        self._failures = {}
+        self._locked_until = {}
+        self._next_sweep = 0
+        self._lock = threading.Lock()
+
+    def _sweep(self, now):
+        """Forgets keys whose failures have all left the window and lockouts that have expired.
+
+        Runs at most once per window, so the maps only hold the names tried recently.
+        """
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.window_seconds
+        cutoff = now - self.window_seconds
+        self._failures = {key: failures for key, failures in self._failures.items() if failures and failures[-1] >= cutoff}
+        self._locked_until = {key: until for key, until in self._locked_until.items() if until > now}
+
+    def check(self, key):
+        """Raises LoginThrottledError if the key is currently locked out."""
+        with self._lock:
+            until = self._locked_until.get(key, 0)
+            if until > time.monotonic():
+                raise LoginThrottledError(f"Too many failed attempts. Try again in {int(until - time.monotonic()) + 1} seconds.")
+
+    def record_failure(self, key):
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            failures = self._failures.setdefault(key, deque())
+            failures.append(now)
+            while failures and failures[0] < now - self.window_seconds:
+                failures.popleft()
+            if len(failures) >= self.max_attempts:
+                self._locked_until[key] = now + self.lockout_seconds
+                del self._failures[key]
+
+    def record_success(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+            self._locked_until.pop(key, None)
+
+limiter = LoginRateLimiter()
+
+@lru_cache(maxsize=1)
+def _dummy_hash():
+    return hash_password(os.urandom(16).hex())
+
+def authenticate(username, password):
+    """Verifies a login and returns the user (username, role, child_id, child_name) or None.
+
+    Plaintext or outdated password hashes are upgraded transparently after a successful login.
+    Raises LoginThrottledError while the username is locked out.
+    """
+    key = (username or "").strip().lower()
+    limiter.check(key)
+    user = get_user_record(username) if username else None
+    # Verify against a dummy hash for unknown users so timing does not reveal which names exist
+    stored = user["password"] if user and user["password"] else _dummy_hash()
+    matches, needs_rehash = _hash_pool.submit(verify_password, password or "", stored).result()
+    if not (user and matches):
+        limiter.record_failure(key)
+        return None
+
+    limiter.record_success(key)
+    if needs_rehash:
+        set_password_hash(user["username"], _hash_pool.submit(hash_password, password).result())
+    return {"username": user["username"], "role": user["role"], "child_id": user["child_id"],
+            "child_name": user["child_name"]}
+
+# --- Signed session tokens ---
+
+def _sign(payload):
+    return hmac.new(_SECRET_KEY, payload, hashlib.sha256).digest()
+
+def issue_session_token(user, ttl_seconds=SESSION_TTL_SECONDS):
+    """Returns a signed token carrying the user's name, role and linked child id."""
+    claims = {"u": user["username"], "r": user["role"], "c": user["child_id"], "exp": int(time.time()) + ttl_seconds}
+    payload = base64.urlsafe_b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{payload.decode('ascii')}.{base64.urlsafe_b64encode(_sign(payload)).decode('ascii')}"
+
+def verify_session_token(token):
+    """Returns the user dict from a valid, unexpired token, otherwise None. No database access."""
+    if not token or "." not in token:
+        return None
+    payload, signature = token.rsplit(".", 1)
+    try:
+        valid = hmac.compare_digest(base64.urlsafe_b64decode(signature), _sign(payload.encode("ascii")))
+        claims = json.loads(base64.urlsafe_b64decode(payload)) if valid else None
+    except (ValueError, UnicodeError):
+        return None
+    if not claims or claims["exp"] < time.time():
+        return None
+    return {"username": claims["u"], "role": claims["r"], "child_id": claims["c"]}
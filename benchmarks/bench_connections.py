@@ -0,0 +1,115 @@
+# benchmarks/bench_connections.py
+"""Compares simulated dashboard rerun latency with per-call connections vs. the pooled layer.
+
+Run from the project root:
+    python benchmarks/bench_connections.py --sessions 40 --reruns 25
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+# --- LEGACY ACCESS PATH (one sqlite3.connect per call, as database.py used to do) ---
+
+def legacy_get_user(username):
+    conn = sqlite3.connect(database.DB_NAME)
+    c = conn.cursor()
+    c.execute("SELECT * FROM users WHERE username=?", (username,))
+    user = c.fetchone()
+    conn.close()
+    return user
+
+def legacy_get_list_data(table_name):
+    conn = sqlite3.connect(database.DB_NAME)
+    df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
+    conn.close()
+    return df
+
+def legacy_save_progress(*row):
+    conn = sqlite3.connect(database.DB_NAME)
+    c = conn.cursor()
+    c.execute("INSERT INTO progress (date, child_id, discipline_id, goal_area_id, status, notes, media_path) VALUES (?, ?, ?, ?, ?, ?, ?)",
+              row)
+    conn.commit()
+    conn.close()
+
+LEGACY = (legacy_get_user, legacy_get_list_data, legacy_save_progress)
+POOLED = (database.get_user_record, database.get_list_data, database.save_progress)
+
+# --- WORKLOAD ---
+
+# Ids in the fresh benchmark database: children are numbered from 1, "OT" and "Regulation" come first
+DISCIPLINE_ID = GOAL_AREA_ID = 1
+
+def seed(children=30, days=120):
+    statuses = ["Regression", "Stable", "Progress"]
+    child_ids = [database.upsert_child(f"Child {i}", "2020-01-01") for i in range(children)]
+    start = date.today() - timedelta(days=days)
+    with database._transaction() as conn:
+        conn.executemany(
+            "INSERT INTO progress (date, child_id, discipline_id, goal_area_id, status, notes, media_path) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [((start + timedelta(days=d)).isoformat(), child_id, DISCIPLINE_ID, GOAL_AREA_ID, statuses[(i + d) % 3], "note", "")
+             for i, child_id in enumerate(child_ids) for d in range(days)])
+
+def rerun(funcs, session_id, write):
+    """One page rerun: auth check, the tracker's three list reads, and optionally a form submit."""
+    get_user, get_list_data, save_progress = funcs
+    get_user("adminuser")
+    for table in ("children", "disciplines", "goal_areas"):
+        get_list_data(table)
+    if write:
+        save_progress(date.today().isoformat(), session_id % 30 + 1, DISCIPLINE_ID, GOAL_AREA_ID, "Stable", "bench", "")
+
+def run(funcs, sessions, reruns, write_every):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def session(session_id):
+        for n in range(reruns):
+            started = time.perf_counter()
+            try:
+                rerun(funcs, session_id, write_every and n % write_every == 0)
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(session, range(sessions)))
+    return latencies, errors
+
+def report(label, latencies, errors):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<8} reruns={len(latencies):<5} mean={statistics.mean(latencies):7.2f}ms "
+          f"p50={statistics.median(latencies):7.2f}ms p95={p95:7.2f}ms errors={len(errors)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=40, help="concurrent simulated sessions")
+    parser.add_argument("--reruns", type=int, default=25, help="reruns per session")
+    parser.add_argument("--write-every", type=int, default=5, help="submit a progress entry every N reruns (0 = read only)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.init_db()
+        seed()
+        for label, funcs in (("legacy", LEGACY), ("pooled", POOLED)):
+            report(label, *run(funcs, args.sessions, args.reruns, args.write_every))
+        database.close_connections()
+
+if __name__ == "__main__":
+    main()
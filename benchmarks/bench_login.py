@@ -0,0 +1,66 @@
+# benchmarks/bench_login.py
+"""Measures password hash cost and concurrent login throughput at a given PBKDF2 work factor.
+
+Run from the project root:
+    python benchmarks/bench_login.py --iterations 600000 --users 20 --logins 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=None, help="PBKDF2 iterations (default: passwords.HASH_ITERATIONS)")
+    parser.add_argument("--users", type=int, default=20, help="distinct accounts")
+    parser.add_argument("--logins", type=int, default=200, help="total login attempts")
+    parser.add_argument("--concurrency", type=int, default=40, help="simultaneous login attempts")
+    args = parser.parse_args()
+
+    if args.iterations:
+        os.environ["TILP_HASH_ITERATIONS"] = str(args.iterations)
+    import auth
+    import database
+    import passwords
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.init_db()
+        for i in range(args.users):
+            database.upsert_user(f"user{i}", f"secret{i}", "OT", None)
+
+        started = time.perf_counter()
+        passwords.hash_password("sample")
+        print(f"work factor: {passwords.HASH_ITERATIONS} iterations, single hash {1000 * (time.perf_counter() - started):.1f}ms, "
+              f"hash workers: {auth.HASH_WORKERS}")
+
+        def login(n):
+            t0 = time.perf_counter()
+            user = auth.authenticate(f"user{n % args.users}", f"secret{n % args.users}")
+            assert user is not None
+            return time.perf_counter() - t0
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            latencies = sorted(pool.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - started
+
+        # Once logged in, reruns only verify the signed token
+        token = auth.issue_session_token({"username": "user0", "role": "OT", "child_id": None})
+        t0 = time.perf_counter()
+        for _ in range(10000):
+            auth.verify_session_token(token)
+        token_us = (time.perf_counter() - t0) / 10000 * 1e6
+
+        print(f"logins: {args.logins} in {elapsed:.2f}s -> {args.logins / elapsed:.1f} logins/s "
+              f"(p50 {1000 * statistics.median(latencies):.0f}ms, p95 {1000 * latencies[int(len(latencies) * 0.95) - 1]:.0f}ms)")
+        print(f"session token check per rerun: {token_us:.1f}us")
+        database.close_connections()
+
+if __name__ == "__main__":
+    main()
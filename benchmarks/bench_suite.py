@@ -0,0 +1,234 @@
+# benchmarks/bench_suite.py
+"""Times the database layer, dashboard data path, exports, login and headless page loads on synthetic data.
+
+Run from the project root; results are written as JSON so two versions can be compared:
+    python benchmarks/bench_suite.py --children 60 --years 2 --output results.json
+    python benchmarks/bench_suite.py --children 60 --years 2 --compare results.json
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def _stats(samples_ms):
+    samples = sorted(samples_ms)
+    return {
+        "n": len(samples),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[math.ceil(len(samples) * 0.95) - 1], 3), # nearest rank
+        "min_ms": round(samples[0], 3),
+    }
+
+def timed(func, repeat):
+    """Runs func `repeat` times and returns latency stats in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return _stats(samples)
+
+# --- BENCHMARK GROUPS ---
+
+def bench_database(repeat, child):
+    import database
+
+    recent = date.today() - timedelta(days=90)
+    cases = {
+        "get_user_record": lambda: database.get_user_record("adminuser"),
+        "get_list_data.children": lambda: database.get_list_data("children"),
+        "get_data_versions": database.get_data_versions,
+        "query_progress.child": lambda: database.query_progress(child_id=child),
+        "count_progress": database.count_progress,
+        "get_progress_page.first": database.get_progress_page,
+        "get_progress_page.child_90d": lambda: database.get_progress_page(child_id=child, start_date=recent),
+        "get_progress_summary.all": database.get_progress_summary,
+        "get_daily_goal_status.all": database.get_daily_goal_status,
+        "get_session_plans": database.get_session_plans,
+        "search_progress_notes": lambda: database.search_progress_notes("visual schedule"),
+        "search_session_plans": lambda: database.search_session_plans("sensory"),
+        # Ids 1 are the first seeded discipline and goal area
+        "save_progress": lambda: database.save_progress(date.today().isoformat(), child, 1, 1,
+                                                        "Stable", "benchmark entry", ""),
+    }
+    return {f"db.{name}": timed(func, repeat) for name, func in cases.items()}
+
+def bench_dashboard(repeat, child):
+    import database
+    from trends import build_trend, fold_new_rows
+
+    results = {}
+    for label, filters in (("all", {}), ("child", {"child_id": child})):
+        results[f"dashboard.snapshot.{label}"] = timed(lambda: database.get_progress_snapshot(**filters), repeat)
+        snapshot = database.get_progress_snapshot(**filters)
+        results[f"dashboard.trend.{label}"] = timed(lambda: build_trend(snapshot["daily"], "auto"), repeat)
+        results[f"dashboard.incremental.{label}"] = timed(
+            lambda: fold_new_rows(snapshot["daily"], database.get_progress_since(snapshot["last_id"] - 5, **filters)[0]),
+            repeat)
+    return results
+
+def bench_exports(repeat):
+    import exports
+
+    results = {}
+    for fmt in ("csv", "csv.gz"):
+        results[f"export.session_plans.{fmt}"] = timed(lambda: exports.write_export("session_plans", fmt), repeat)
+    results["export.progress.csv"] = timed(lambda: exports.write_export("progress", "csv"), max(1, repeat // 5))
+    return results
+
+def bench_login(repeat):
+    import auth
+
+    auth.authenticate("adminuser", "admin123") # Warms the hash path before timing
+    results = {"login.authenticate": timed(lambda: auth.authenticate("adminuser", "admin123"), repeat)}
+    token = auth.issue_session_token({"username": "adminuser", "role": "admin", "child_id": None})
+    results["login.verify_session_token"] = timed(lambda: auth.verify_session_token(token), repeat * 100)
+    return results
+
+PAGE_ACCOUNTS = (("adminuser", "admin123"), ("parent0", "parent0"))
+
+def _init_page_worker(db_name, cwd):
+    import database
+
+    os.chdir(cwd)
+    database.DB_NAME = db_name
+
+def _page_session(n, reruns):
+    """One simulated user: login, then every page of their role `reruns` times. Returns samples per page."""
+    from streamlit.testing.v1 import AppTest
+
+    username, password = PAGE_ACCOUNTS[n % len(PAGE_ACCOUNTS)]
+    samples = {}
+    started = time.perf_counter()
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120).run()
+    at.text_input[0].input(username)
+    at.text_input[1].input(password)
+    at.button[0].click().run()
+    samples["login"] = [(time.perf_counter() - started) * 1000]
+    for _ in range(reruns):
+        for page in at.sidebar.radio[0].options:
+            started = time.perf_counter()
+            at.sidebar.radio[0].set_value(page).run()
+            if at.exception:
+                raise RuntimeError(f"{page}: {at.exception[0].message}")
+            name = page.split(" ", 1)[1].split(" &")[0].split("'")[0].strip().lower().replace(" ", "_")
+            samples.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+    return samples
+
+def bench_pages(users, reruns):
+    """Simulates concurrent users, each driving the app headlessly with AppTest in its own process.
+
+    AppTest sessions cannot share a process concurrently, so every user gets a worker process; all of
+    them hit the same database file, as concurrent sessions of one server would.
+    """
+    import database
+
+    merged = {}
+    started = time.perf_counter()
+    # Spawned, not forked: the parent already runs thread pools (password hashing) and SQLite connections
+    with ProcessPoolExecutor(max_workers=users, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_page_worker,
+                             initargs=(database.DB_NAME, os.getcwd())) as pool:
+        for samples in pool.map(_page_session, range(users), [reruns] * users):
+            for name, values in samples.items():
+                merged.setdefault(name, []).extend(values)
+    elapsed = time.perf_counter() - started
+    results = {f"page.{name}": _stats(values) for name, values in merged.items()}
+    results["page.total_wall_s"] = {"n": users, "seconds": round(elapsed, 3)}
+    return results
+
+# --- OUTPUT ---
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, baseline):
+    """Prints the p50 change for every benchmark present in both result sets."""
+    print(f"\n{'benchmark':<40} {'baseline p50':>14} {'current p50':>14} {'change':>9}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name, {})
+        if "p50_ms" not in result or "p50_ms" not in before:
+            continue
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+        print(f"{name:<40} {before['p50_ms']:>12.2f}ms {result['p50_ms']:>12.2f}ms {change:>+8.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--children", type=int, default=30)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--goals-per-day", type=int, default=2)
+    parser.add_argument("--media-files", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per function")
+    parser.add_argument("--users", type=int, default=4, help="concurrent AppTest sessions (0 skips page loads)")
+    parser.add_argument("--reruns", type=int, default=2, help="passes over every page per session")
+    parser.add_argument("--hash-iterations", type=int, default=None, help="PBKDF2 work factor for the login timings")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    if args.hash_iterations:
+        os.environ["TILP_HASH_ITERATIONS"] = str(args.hash_iterations)
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    import database
+    from benchmarks.synthetic import generate
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Exports and media are written relative to the working directory, keep them out of the project
+        os.chdir(tmp)
+        database.DB_NAME = os.path.join(tmp, "tilp_data.db")
+        database.init_db()
+        started = time.perf_counter()
+        counts = generate(args.children, args.years, args.goals_per_day, media_files=args.media_files)
+        print(f"generated {counts} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        child = next(i for i, name in database.get_progress_children().items() if name == "Child 000")
+        results = {}
+        for label, run in (("database", lambda: bench_database(args.repeat, child)),
+                           ("dashboard", lambda: bench_dashboard(args.repeat, child)),
+                           ("exports", lambda: bench_exports(args.repeat)),
+                           ("login", lambda: bench_login(max(1, args.repeat // 4))),
+                           ("pages", lambda: bench_pages(args.users, args.reruns) if args.users else {})):
+            print(f"running {label} benchmarks...", file=sys.stderr)
+            results.update(run())
+        database.close_connections()
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": {**vars(args), "rows": counts},
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in results.items():
+        if "p50_ms" in result:
+            print(f"{name:<40} p50={result['p50_ms']:9.2f}ms p95={result['p95_ms']:9.2f}ms (n={result['n']})")
+    print(f"results written to {output}")
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
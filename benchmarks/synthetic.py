@@ -0,0 +1,97 @@
+# benchmarks/synthetic.py
+"""Generates a synthetic TILP Connect dataset at a configurable scale.
+
+Used by the benchmark suite, or on its own to fill a scratch database from the project root:
+    python benchmarks/synthetic.py --db scratch.db --children 60 --years 3 --media-files 200
+"""
+import argparse
+import io
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+STATUSES = ("Regression", "Stable", "Progress")
+PLAN_PHRASES = ("obstacle course", "visual schedule", "sensory bins", "turn-taking game", "circle time story",
+                "weighted blanket", "tidy up song", "peer modelling", "first-then board", "sensory tent")
+NOTE_PHRASES = ("used the visual schedule", "needed a regulation break", "requested help with words",
+                "shared toys with a peer", "completed the puzzle", "transitioned without prompting",
+                "used two-word phrases", "tolerated the new texture", "followed a two-step direction")
+
+def _note(rng):
+    return f"{rng.choice(NOTE_PHRASES).capitalize()} and {rng.choice(NOTE_PHRASES)}."
+
+def generate(children=30, years=1, goals_per_day=2, plans=True, media_files=0, seed=42, batch_size=5000):
+    """Fills the current database.DB_NAME with synthetic data and returns the row counts.
+
+    Every child gets `goals_per_day` progress entries per weekday over `years` years ending today;
+    `media_files` small JPEG-named files are stored through media_store and attached to random entries.
+    """
+    import media_store
+
+    rng = random.Random(seed)
+    disciplines = database.get_list_data("disciplines")["name"].tolist()
+    goal_areas = database.get_list_data("goal_areas")["name"].tolist()
+    names = [f"Child {i:03d}" for i in range(children)]
+    database.bulk_insert("children", [{"child_name": name, "parent_username": f"parent{i}", "date_of_birth": "2020-01-01"}
+                                      for i, name in enumerate(names)])
+    # One parent login is enough for the page benchmarks (each account costs a full password hash)
+    child_rows = database.get_list_data("children")
+    database.upsert_user("parent0", "parent0", "parent", int(child_rows.loc[child_rows["child_name"] == names[0], "id"].iloc[0]))
+
+    start = date.today() - timedelta(days=365 * years)
+    days = [start + timedelta(days=d) for d in range(365 * years) if (start + timedelta(days=d)).weekday() < 5]
+    counts = {"children": children, "progress": 0, "session_plans": 0, "media_files": 0}
+
+    batch = []
+    for day in days:
+        for name in names:
+            for _ in range(goals_per_day):
+                batch.append({"date": day.isoformat(), "child_name": name, "discipline": rng.choice(disciplines),
+                              "goal_area": rng.choice(goal_areas), "status": rng.choice(STATUSES),
+                              "notes": _note(rng), "media_path": ""})
+        if len(batch) >= batch_size:
+            counts["progress"] += database.bulk_insert("progress", batch)
+            batch = []
+    counts["progress"] += database.bulk_insert("progress", batch)
+
+    if plans:
+        counts["session_plans"] = database.bulk_insert("session_plans", [
+            {"date": day.isoformat(), "lead_staff": "Lead OT", "support_staff": "Assistant/BI",
+             **{column: rng.choice(PLAN_PHRASES) for column in database.SEARCH_PLAN_COLUMNS},
+             "materials_needed": rng.choice(PLAN_PHRASES)}
+            for day in days])
+
+    media = []
+    for n in range(media_files):
+        record = media_store.save_upload(io.BytesIO(rng.randbytes(rng.randint(20_000, 200_000))), f"synthetic_{n}.jpg")
+        media.append(record)
+    if media:
+        ids = rng.sample(range(1, counts["progress"] + 1), min(len(media), counts["progress"]))
+        with database._transaction() as conn:
+            conn.executemany("UPDATE progress SET media_path=?, media_id=? WHERE id=?",
+                             [(record["path"], record["id"], row_id) for record, row_id in zip(media, ids)])
+        counts["media_files"] = len(media)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="database file to create or extend")
+    parser.add_argument("--children", type=int, default=30)
+    parser.add_argument("--years", type=int, default=1, help="years of weekday progress per child")
+    parser.add_argument("--goals-per-day", type=int, default=2)
+    parser.add_argument("--media-files", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    database.DB_NAME = args.db
+    database.init_db()
+    counts = generate(args.children, args.years, args.goals_per_day, media_files=args.media_files, seed=args.seed)
+    print(", ".join(f"{count} {table}" for table, count in counts.items()))
+    database.close_connections()
+
+if __name__ == "__main__":
+    main()
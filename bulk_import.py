@@ -0,0 +1,181 @@
+# bulk_import.py
+"""Bulk import of historical progress, children and session plans from CSV or XLSX files.
+
+Files are read row by row, validated against the current children/disciplines/goal_areas lists,
+and inserted in batched transactions. Usage from the project root:
+
+    python bulk_import.py progress historical_notes.csv
+    python bulk_import.py session_plans "Daily Session Plan.xlsx" --batch-size 5000
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from datetime import date
+from database import (init_db, get_list_data, bulk_insert, normalize_date, STATUS_SCORES,
+                      IMPORT_STATEMENTS, IMPORT_BATCH_SIZE)
+
+IMPORT_TABLES = tuple(IMPORT_STATEMENTS)
+MAX_REPORTED_ERRORS = 1000
+
+# Spreadsheet headers that differ from the column names (after lower-casing and '_' for spaces)
+COLUMN_ALIASES = {
+    "child": "child_name",
+    "goal": "goal_area",
+    "performance_status": "status",
+    "anecdotal_notes": "notes",
+    "parent": "parent_username",
+    "parent_login_id": "parent_username",
+    "dob": "date_of_birth",
+    "date_of_session": "date",
+    "session_lead": "lead_staff",
+    "warm-up_activity": "warm_up",
+    "learning_block_(main_activity)": "learning_block",
+    "small_group_/_social_play": "social_play",
+    "internal_notes_for_staff": "internal_notes",
+}
+
+REQUIRED_COLUMNS = {
+    "progress": ("date", "child_name", "discipline", "goal_area", "status"),
+    "children": ("child_name",),
+    "session_plans": ("date",),
+}
+
+def _normalize_header(name):
+    key = str(name or "").strip().lower().replace(" ", "_")
+    return COLUMN_ALIASES.get(key, key)
+
+def _read_csv(f):
+    reader = csv.reader(f)
+    headers = next(reader, [])
+    yield [_normalize_header(h) for h in headers]
+    yield from reader
+
+def _read_xlsx(f):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("XLSX import requires the 'openpyxl' package; save the sheet as CSV instead.")
+    workbook = load_workbook(f, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        yield [_normalize_header(h) for h in next(rows, [])]
+        for row in rows:
+            yield ["" if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+def read_rows(f, file_name):
+    """Yields (line number, dict keyed by normalized column name) for each data row of a CSV/XLSX file."""
+    if file_name.lower().endswith((".xlsx", ".xlsm")):
+        rows = _read_xlsx(f)
+    else:
+        if not isinstance(f, io.TextIOBase):
+            f = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+        rows = _read_csv(f)
+    headers = next(rows, [])
+    # Line 1 is the header row
+    for line, values in enumerate(rows, start=2):
+        if not any(str(v).strip() for v in values):
+            continue # Skip blank spreadsheet rows
+        yield line, dict(zip(headers, values))
+
+class _Validator:
+    """Checks rows against the reference lists loaded once at the start of an import."""
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self.children = set(get_list_data("children")["child_name"])
+        self.disciplines = set(get_list_data("disciplines")["name"])
+        self.goal_areas = set(get_list_data("goal_areas")["name"])
+        users = get_list_data("users")
+        self.parents = set(users.loc[users["role"] == "parent", "username"])
+
+    def clean(self, row):
+        """Returns the row ready for insertion, or raises ValueError describing the problem."""
+        row = {k: (str(v).strip() if v is not None else "") for k, v in row.items()}
+        missing = [c for c in REQUIRED_COLUMNS[self.table_name] if not row.get(c)]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
+        for column in ("date", "date_of_birth"):
+            if row.get(column):
+                try:
+                    row[column] = date.fromisoformat(normalize_date(row[column])).isoformat()
+                except ValueError:
+                    raise ValueError(f"unrecognized {column} '{row[column]}'") from None
+
+        if self.table_name == "progress":
+            if row["child_name"] not in self.children:
+                raise ValueError(f"unknown child '{row['child_name']}'")
+            if row["discipline"] not in self.disciplines:
+                raise ValueError(f"unknown discipline '{row['discipline']}'")
+            if row["goal_area"] not in self.goal_areas:
+                raise ValueError(f"unknown goal area '{row['goal_area']}'")
+            if row["status"] not in STATUS_SCORES:
+                raise ValueError(f"status must be one of {', '.join(STATUS_SCORES)}")
+            row.setdefault("media_path", "")
+        elif self.table_name == "children":
+            row["parent_username"] = row.get("parent_username") or None
+            if row["parent_username"] and row["parent_username"] not in self.parents:
+                raise ValueError(f"'{row['parent_username']}' is not a parent login")
+            self.children.add(row["child_name"])
+        return row
+
+def import_file(table_name, f, file_name, batch_size=IMPORT_BATCH_SIZE, on_progress=None):
+    """Streams a CSV/XLSX file into a table and returns a summary dict.
+
+    Valid rows are inserted in transactions of `batch_size`; invalid rows are skipped and reported
+    as (line number, message) in "errors". `on_progress(summary)` is called after every batch.
+    """
+    if table_name not in IMPORT_TABLES:
+        raise ValueError(f"Unknown import table: {table_name}")
+    validator = _Validator(table_name)
+    summary = {"table": table_name, "rows": 0, "inserted": 0, "errors": [], "error_count": 0,
+               "seconds": 0.0, "rows_per_second": 0.0}
+    started = time.perf_counter()
+    batch = []
+
+    def flush():
+        if batch:
+            summary["inserted"] += bulk_insert(table_name, batch)
+            batch.clear()
+        summary["seconds"] = time.perf_counter() - started
+        summary["rows_per_second"] = summary["rows"] / summary["seconds"] if summary["seconds"] else 0.0
+        if on_progress:
+            on_progress(summary)
+
+    for line, row in read_rows(f, file_name):
+        summary["rows"] += 1
+        try:
+            batch.append(validator.clean(row))
+        except ValueError as e:
+            summary["error_count"] += 1
+            if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                summary["errors"].append((line, str(e)))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import CSV/XLSX data into TILP Connect.")
+    parser.add_argument("table", choices=IMPORT_TABLES)
+    parser.add_argument("path", help="CSV or XLSX file")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="rows per transaction")
+    args = parser.parse_args()
+
+    init_db()
+    with open(args.path, "rb") as f:
+        summary = import_file(args.table, f, os.path.basename(args.path), args.batch_size,
+                              on_progress=lambda s: print(f"  {s['rows']} rows read, {s['inserted']} inserted "
+                                                          f"({s['rows_per_second']:.0f} rows/s)", file=sys.stderr))
+    for line, message in summary["errors"]:
+        print(f"line {line}: {message}")
+    print(f"{summary['inserted']} of {summary['rows']} rows imported into {args.table} in {summary['seconds']:.2f}s "
+          f"({summary['rows_per_second']:.0f} rows/s), {summary['error_count']} rejected.")
+    return 1 if summary["error_count"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
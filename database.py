@@ -1,17 +1,100 @@
 # views/database.py (NEW LOCATION: Move this file into your 'views' folder)
+import mimetypes
+import os
+import queue
+import re
 import sqlite3
-import pandas as pd
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from passwords import hash_password, is_hashed
+from instrumentation import instrument_module
 
 DB_NAME = "tilp_data.db"
 
-# --- CORE DB FUNCTIONS ---
+# --- CONNECTION POOL ---
+# Every Streamlit rerun used to open (and tear down) several connections. Connections are now
+# kept in a small per-database pool and shared by all sessions of the server process.
+POOL_SIZE = 8
+BUSY_TIMEOUT_SECONDS = 10
 
-def init_db():
-    """Creates all necessary tables, ensures schema is up-to-date, and populates initial admin/lists."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",        # readers never block the writer (and vice versa)
+    "PRAGMA synchronous=NORMAL",      # safe with WAL, avoids an fsync on every commit
+    "PRAGMA cache_size=-16000",       # ~16 MB page cache per connection
+    "PRAGMA mmap_size=134217728",     # 128 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+)
+
+_pools = {}
+_pools_lock = threading.Lock()
+# SQLite allows a single writer at a time; serializing writes in-process means concurrent
+# form submissions queue up here instead of failing with "database is locked".
+_write_lock = threading.Lock()
+
+def _open_connection(db_name):
+    """Opens a connection tuned for concurrent use by the Streamlit server threads."""
+    conn = sqlite3.connect(db_name, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False,
+                           isolation_level=None)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _get_pool(db_name):
+    pool = _pools.get(db_name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(db_name, queue.LifoQueue(maxsize=POOL_SIZE))
+    return pool
+
+@contextmanager
+def _connection():
+    """Borrows a pooled connection for reads. Opens a new one if the pool is empty."""
+    pool = _get_pool(DB_NAME)
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection(DB_NAME)
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+@contextmanager
+def _transaction():
+    """Borrows a pooled connection and runs the block as one serialized write transaction."""
+    with _write_lock, _connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        conn.execute("COMMIT")
+
+def close_connections():
+    """Closes all pooled connections (e.g. after pointing DB_NAME at another file)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+# --- SCHEMA MIGRATIONS ---
+# Each migration upgrades the schema by exactly one version. The applied version is stored in
+# PRAGMA user_version, so init_db() only has to read one header field once the schema is current.
+
+def _migrate_base_schema(c):
+    """v1: Creates all necessary tables and populates initial admin/lists."""
     # 1. Table: Users (Staff & Parent Logins)
     c.execute('''CREATE TABLE IF NOT EXISTS users (
         username TEXT PRIMARY KEY,
@@ -19,7 +102,7 @@ def init_db():
         role TEXT, 
         child_link TEXT 
     )''')
-    
+
     # 2. Table: Children Profiles
     c.execute('''CREATE TABLE IF NOT EXISTS children (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -27,7 +110,7 @@ def init_db():
         parent_username TEXT, 
         date_of_birth TEXT
     )''')
-    
+
     # 3. Table: Custom Lists
     c.execute('''CREATE TABLE IF NOT EXISTS disciplines (
         name TEXT UNIQUE
@@ -35,7 +118,7 @@ def init_db():
     c.execute('''CREATE TABLE IF NOT EXISTS goal_areas (
         name TEXT UNIQUE
     )''')
-    
+
     # 4. Table: Progress Tracker (Minimal pre-migration schema)
     c.execute('''CREATE TABLE IF NOT EXISTS progress (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -47,7 +130,7 @@ def init_db():
         notes TEXT
         -- media_path is added via migration below
     )''')
-    
+
     # 5. Table: Session Plans
     c.execute('''CREATE TABLE IF NOT EXISTS session_plans (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -70,130 +153,1247 @@ def init_db():
     except sqlite3.OperationalError:
         # If it fails, the column is missing, so add it.
         c.execute("ALTER TABLE progress ADD COLUMN media_path TEXT DEFAULT ''")
-        conn.commit()
-    
+
     # --- Initial Data Load (Ensures admin/lists exist) ---
     c.execute("INSERT OR IGNORE INTO users (username, password, role, child_link) VALUES (?, ?, ?, ?)",
-              ("adminuser", "admin123", "admin", "All"))
-    
+              ("adminuser", hash_password("admin123"), "admin", "All"))
+
     for d in ["OT", "SLP", "BC", "ECE", "Assistant"]:
         c.execute("INSERT OR IGNORE INTO disciplines (name) VALUES (?)", (d,))
-        
+    
     for g in ["Regulation", "Communication", "Fine Motor", "Social Play"]:
         c.execute("INSERT OR IGNORE INTO goal_areas (name) VALUES (?)", (g,))
-        
-    conn.commit()
-    conn.close()
-
-def get_user(username, password):
-    """Retrieves user details for login."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE username=? AND password=?", (username, password))
-    user = c.fetchone()
-    conn.close()
+
+def _migrate_indexes(c):
+    """v2: Adds the indexes used by the dashboard filters, the notes feed and the planner."""
+    c.execute("CREATE INDEX IF NOT EXISTS idx_progress_child_date ON progress (child_name, date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_progress_goal_date ON progress (goal_area, date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_progress_date ON progress (date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_session_plans_date ON session_plans (date)")
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%d-%m-%Y", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S")
+
+def normalize_date(value):
+    """Converts a stored date string to ISO YYYY-MM-DD (sortable and indexable as TEXT)."""
+    if not value:
+        return value
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(text).date().isoformat()
+    except ValueError:
+        return text # Leave unparseable values untouched rather than lose them
+
+def _migrate_iso_dates(c):
+    """v3: Rewrites any non-ISO dates so that date ordering and range filters work in SQL."""
+    for table, column in (("progress", "date"), ("session_plans", "date"), ("children", "date_of_birth")):
+        rows = c.execute(f"SELECT id, {column} FROM {table} "
+                         f"WHERE {column} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'").fetchall()
+        c.executemany(f"UPDATE {table} SET {column}=? WHERE id=?",
+                      [(normalize_date(value), row_id) for row_id, value in rows])
+
+def _migrate_progress_aggregates(c):
+    """v4: Adds the data version counters and the per-day progress summary, both kept current by triggers."""
+    c.execute('''CREATE TABLE IF NOT EXISTS data_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )''')
+    c.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('progress', 0)")
+
+    # One row per child/discipline/goal/day; dashboard metrics and trends read this instead of progress
+    c.execute('''CREATE TABLE IF NOT EXISTS progress_daily (
+        child_name TEXT,
+        discipline TEXT,
+        goal_area TEXT,
+        date TEXT,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        regression INTEGER NOT NULL DEFAULT 0,
+        stable INTEGER NOT NULL DEFAULT 0,
+        progress INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (child_name, discipline, goal_area, date)
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_progress_daily_date ON progress_daily (date)")
+    c.execute('''INSERT INTO progress_daily (child_name, discipline, goal_area, date, sessions, regression, stable, progress)
+                 SELECT child_name, discipline, goal_area, date, COUNT(*),
+                        SUM(status = 'Regression'), SUM(status = 'Stable'), SUM(status = 'Progress')
+                 FROM progress GROUP BY child_name, discipline, goal_area, date''')
+
+    _create_daily_triggers(c, ("child_name", "discipline", "goal_area"))
+
+def _create_daily_triggers(c, keys):
+    """Keeps progress_daily (grouped by the `keys` columns and date) and the progress version current."""
+    columns = ", ".join(keys)
+    new_keys = ", ".join(f"NEW.{key}" for key in keys)
+    same_day = " AND ".join(f"{key} IS OLD.{key}" for key in (*keys, "date"))
+    add_row = f'''INSERT INTO progress_daily ({columns}, date, sessions, regression, stable, progress)
+                 VALUES ({new_keys}, NEW.date, 1,
+                         NEW.status = 'Regression', NEW.status = 'Stable', NEW.status = 'Progress')
+                 ON CONFLICT ({columns}, date) DO UPDATE SET
+                     sessions = sessions + 1,
+                     regression = regression + excluded.regression,
+                     stable = stable + excluded.stable,
+                     progress = progress + excluded.progress;'''
+    remove_row = f'''UPDATE progress_daily SET
+                     sessions = sessions - 1,
+                     regression = regression - (OLD.status = 'Regression'),
+                     stable = stable - (OLD.status = 'Stable'),
+                     progress = progress - (OLD.status = 'Progress')
+                 WHERE {same_day};
+                 DELETE FROM progress_daily WHERE {same_day} AND sessions <= 0;'''
+    bump = "UPDATE data_versions SET version = version + 1 WHERE name = 'progress';"
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_progress_insert AFTER INSERT ON progress BEGIN {add_row} {bump} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_progress_delete AFTER DELETE ON progress BEGIN {remove_row} {bump} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_progress_update AFTER UPDATE ON progress BEGIN {remove_row} {add_row} {bump} END")
+
+REFERENCE_TABLES = ("users", "children", "disciplines", "goal_areas")
+
+def _migrate_reference_versions(c):
+    """v5: Tracks a data version for each reference table so cached lists know when to refresh."""
+    for table in REFERENCE_TABLES:
+        c.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, 0)", (table,))
+        _create_version_triggers(c, table)
+
+def _create_version_triggers(c, table):
+    bump = f"UPDATE data_versions SET version = version + 1 WHERE name = '{table}';"
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()} AFTER {event} ON {table} BEGIN {bump} END")
+
+def _migrate_media_derivatives(c):
+    """v6: Stores the paths of the generated thumbnail and web preview next to media_path."""
+    columns = [row[1] for row in c.execute("PRAGMA table_info(progress)")]
+    for column in ("thumb_path", "preview_path"):
+        if column not in columns:
+            c.execute(f"ALTER TABLE progress ADD COLUMN {column} TEXT DEFAULT ''")
+
+def _migrate_media_files(c):
+    """v7: Adds content-addressed media metadata and links existing progress media to it."""
+    c.execute('''CREATE TABLE IF NOT EXISTS media_files (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sha256 TEXT UNIQUE,
+        path TEXT UNIQUE,
+        size_bytes INTEGER,
+        mime_type TEXT,
+        created_at TEXT
+    )''')
+    columns = [row[1] for row in c.execute("PRAGMA table_info(progress)")]
+    if "media_id" not in columns:
+        c.execute("ALTER TABLE progress ADD COLUMN media_id INTEGER REFERENCES media_files (id)")
+
+    # Legacy uploads (random uuid names) are registered without a hash; missing files stay unlinked
+    paths = [row[0] for row in c.execute("SELECT DISTINCT media_path FROM progress WHERE media_path != ''")]
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        c.execute("INSERT OR IGNORE INTO media_files (path, size_bytes, mime_type, created_at) VALUES (?, ?, ?, ?)",
+                  (path, os.path.getsize(path), mimetypes.guess_type(path)[0],
+                   datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds")))
+    c.execute('''UPDATE progress SET media_id = (SELECT id FROM media_files WHERE media_files.path = progress.media_path)
+                 WHERE media_path != '' AND media_id IS NULL''')
+
+SEARCH_PLAN_COLUMNS = ("warm_up", "learning_block", "regulation_break", "social_play", "closing_routine", "internal_notes")
+
+def _migrate_search_index(c):
+    """v8: Adds FTS5 indexes over progress notes and the session plan text blocks, synced by triggers."""
+    indexes = (("progress", ("notes",)), ("session_plans", SEARCH_PLAN_COLUMNS))
+    for table, columns in indexes:
+        # External-content index: the text lives only in the base table, the index holds the tokens
+        c.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({', '.join(columns)}, "
+                  f"content='{table}', content_rowid='id', tokenize='porter unicode61')")
+        c.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+        _create_search_triggers(c, table, columns)
+
+def _create_search_triggers(c, table, columns):
+    new_values = ", ".join(f"NEW.{col}" for col in columns)
+    old_values = ", ".join(f"OLD.{col}" for col in columns)
+    add_row = f"INSERT INTO {table}_fts (rowid, {', '.join(columns)}) VALUES (NEW.id, {new_values});"
+    remove_row = (f"INSERT INTO {table}_fts ({table}_fts, rowid, {', '.join(columns)}) "
+                  f"VALUES ('delete', OLD.id, {old_values});")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_insert AFTER INSERT ON {table} BEGIN {add_row} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_delete AFTER DELETE ON {table} BEGIN {remove_row} END")
+    # Only text edits touch the index (media derivative updates and the like do not)
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_update AFTER UPDATE OF {', '.join(columns)} ON {table} "
+              f"BEGIN {remove_row} {add_row} END")
+
+def _migrate_progress_mutations(c):
+    """v9: Counts progress edits and deletions separately, so inserts alone can be applied incrementally."""
+    c.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('progress_mutations', 0)")
+    _create_mutation_triggers(c, ("date", "child_name", "discipline", "goal_area", "status"))
+
+def _create_mutation_triggers(c, columns):
+    bump = "UPDATE data_versions SET version = version + 1 WHERE name = 'progress_mutations';"
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_progress_mutation_delete AFTER DELETE ON progress BEGIN {bump} END")
+    # Only columns the dashboard aggregates count; note and media edits do not change the metrics
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_progress_mutation_update "
+              f"AFTER UPDATE OF {', '.join(columns)} ON progress BEGIN {bump} END")
+
+def _migrate_jobs(c):
+    """v10: Adds the background job queue (status and results survive reruns and restarts)."""
+    c.execute('''CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        params TEXT,
+        owner TEXT,
+        status TEXT NOT NULL DEFAULT 'queued',
+        result TEXT,
+        error TEXT,
+        created_at TEXT,
+        started_at TEXT,
+        finished_at TEXT
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner_kind ON jobs (owner, kind, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+
+# progress refers to its child, discipline and goal area by these integer keys
+PROGRESS_KEYS = {"child_id": "children", "discipline_id": "disciplines", "goal_area_id": "goal_areas"}
+NAME_COLUMNS = {"children": "child_name", "disciplines": "name", "goal_areas": "name"}
+# Archived entry that progress rows without a child, discipline or goal area point to. SQLite treats
+# NULLs as distinct in UNIQUE constraints, so a NULL key would break the progress_daily upserts.
+UNKNOWN_NAME = "(unknown)"
+
+def _migrate_integer_keys(c):
+    """v11: Replaces the names repeated in every progress row with integer keys into the reference tables.
+
+    Parent logins link to their child by id (users.child_id) instead of the 'All'/'None' name
+    sentinels, so renaming a child or goal area updates one row. Names still used by progress but no
+    longer in their list become archived entries, keeping every row's history readable; rows with no
+    name at all point to an archived UNKNOWN_NAME entry.
+    """
+    c.execute('''CREATE TABLE children_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        child_name TEXT UNIQUE NOT NULL,
+        date_of_birth TEXT,
+        archived INTEGER NOT NULL DEFAULT 0
+    )''')
+    c.execute('''INSERT INTO children_new (id, child_name, date_of_birth)
+                 SELECT id, child_name, date_of_birth FROM children WHERE child_name IS NOT NULL AND child_name != \'\'''')
+    for table in ("disciplines", "goal_areas"):
+        c.execute(f'''CREATE TABLE {table}_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            archived INTEGER NOT NULL DEFAULT 0
+        )''')
+        c.execute(f"INSERT INTO {table}_new (id, name) SELECT rowid, name FROM {table} WHERE name IS NOT NULL AND name != ''")
+    for column, table in (("child_name", "children"), ("discipline", "disciplines"), ("goal_area", "goal_areas")):
+        c.execute(f"INSERT OR IGNORE INTO {table}_new ({NAME_COLUMNS[table]}, archived) "
+                  f"SELECT DISTINCT IFNULL(NULLIF({column}, ''), ?), 1 FROM progress", (UNKNOWN_NAME,))
+
+    c.execute('''CREATE TABLE users_new (
+        username TEXT PRIMARY KEY,
+        password TEXT,
+        role TEXT,
+        child_id INTEGER REFERENCES children (id)
+    )''')
+    # Parent links were kept on both sides and could disagree; users.child_link wins
+    c.execute('''INSERT INTO users_new (username, password, role, child_id)
+                 SELECT username, password, role,
+                        CASE WHEN role = 'parent' THEN COALESCE(
+                            (SELECT id FROM children_new WHERE child_name = users.child_link),
+                            (SELECT children_new.id FROM children JOIN children_new USING (child_name)
+                             WHERE children.parent_username = users.username LIMIT 1)) END
+                 FROM users''')
+
+    c.execute('''CREATE TABLE progress_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT,
+        child_id INTEGER REFERENCES children (id),
+        discipline_id INTEGER REFERENCES disciplines (id),
+        goal_area_id INTEGER REFERENCES goal_areas (id),
+        status TEXT,
+        notes TEXT,
+        media_path TEXT DEFAULT '',
+        thumb_path TEXT DEFAULT '',
+        preview_path TEXT DEFAULT '',
+        media_id INTEGER REFERENCES media_files (id)
+    )''')
+    c.execute('''INSERT INTO progress_new (id, date, child_id, discipline_id, goal_area_id, status, notes,
+                                           media_path, thumb_path, preview_path, media_id)
+                 SELECT progress.id, date, children_new.id, disciplines_new.id, goal_areas_new.id, status, notes,
+                        media_path, thumb_path, preview_path, media_id
+                 FROM progress
+                 LEFT JOIN children_new ON children_new.child_name = IFNULL(NULLIF(progress.child_name, ''), :unknown)
+                 LEFT JOIN disciplines_new ON disciplines_new.name = IFNULL(NULLIF(progress.discipline, ''), :unknown)
+                 LEFT JOIN goal_areas_new ON goal_areas_new.name = IFNULL(NULLIF(progress.goal_area, ''), :unknown)''',
+              {"unknown": UNKNOWN_NAME})
+
+    c.execute('''CREATE TABLE progress_daily_new (
+        child_id INTEGER,
+        discipline_id INTEGER,
+        goal_area_id INTEGER,
+        date TEXT,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        regression INTEGER NOT NULL DEFAULT 0,
+        stable INTEGER NOT NULL DEFAULT 0,
+        progress INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (child_id, discipline_id, goal_area_id, date)
+    )''')
+    c.execute('''INSERT INTO progress_daily_new (child_id, discipline_id, goal_area_id, date, sessions, regression, stable, progress)
+                 SELECT child_id, discipline_id, goal_area_id, date, COUNT(*),
+                        SUM(status = 'Regression'), SUM(status = 'Stable'), SUM(status = 'Progress')
+                 FROM progress_new GROUP BY child_id, discipline_id, goal_area_id, date''')
+
+    # Dropping the old tables also drops their indexes and triggers; ids are unchanged, so the
+    # external-content search index over progress notes stays valid
+    for table in ("progress", "progress_daily", "users", "children", "disciplines", "goal_areas"):
+        c.execute(f"DROP TABLE {table}")
+        c.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+    c.execute("CREATE INDEX idx_progress_child_date ON progress (child_id, date)")
+    c.execute("CREATE INDEX idx_progress_discipline_date ON progress (discipline_id, date)")
+    c.execute("CREATE INDEX idx_progress_goal_date ON progress (goal_area_id, date)")
+    c.execute("CREATE INDEX idx_progress_date ON progress (date)")
+    c.execute("CREATE INDEX idx_progress_daily_date ON progress_daily (date)")
+    c.execute("CREATE INDEX idx_users_child ON users (child_id)")
+
+    _create_daily_triggers(c, tuple(PROGRESS_KEYS))
+    _create_mutation_triggers(c, ("date", *PROGRESS_KEYS, "status"))
+    _create_search_triggers(c, "progress", ("notes",))
+    for table in REFERENCE_TABLES:
+        _create_version_triggers(c, table)
+    # A rename changes how existing progress rows read, so cached dashboards and reports must refresh
+    bump = "UPDATE data_versions SET version = version + 1 WHERE name IN ('progress', 'progress_mutations');"
+    for table, column in NAME_COLUMNS.items():
+        c.execute(f"CREATE TRIGGER trg_{table}_rename AFTER UPDATE OF {column} ON {table} BEGIN {bump} END")
+
+    # Progress rows as the app shows and exports them: the keys plus the names they point to
+    c.execute('''CREATE VIEW progress_named AS
+                 SELECT progress.*, children.child_name, disciplines.name AS discipline, goal_areas.name AS goal_area
+                 FROM progress
+                 LEFT JOIN children ON children.id = progress.child_id
+                 LEFT JOIN disciplines ON disciplines.id = progress.discipline_id
+                 LEFT JOIN goal_areas ON goal_areas.id = progress.goal_area_id''')
+
+def _migrate_directory_indexes(c):
+    """v12: Case-insensitive name indexes, so the admin directory's prefix searches (LIKE 'abc%') seek."""
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_username_nocase ON users (username COLLATE NOCASE)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_children_name_nocase ON children (child_name COLLATE NOCASE)")
+
+def _migrate_media_lifecycle(c):
+    """v13: Records each media file's storage tier (original, compressed, archived) and its size as uploaded."""
+    columns = [row[1] for row in c.execute("PRAGMA table_info(media_files)")]
+    if "tier" not in columns:
+        c.execute("ALTER TABLE media_files ADD COLUMN tier TEXT NOT NULL DEFAULT 'original'")
+    if "original_size_bytes" not in columns:
+        c.execute("ALTER TABLE media_files ADD COLUMN original_size_bytes INTEGER")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_media_files_tier_created ON media_files (tier, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_progress_media ON progress (media_id) WHERE media_id IS NOT NULL")
+
+# Session plan features the analytics compare outcomes by: 'any' (a plan exists that day),
+# 'lead:<lead staff>' and 'block:<column>' for each block the plan fills in
+PLAN_BLOCKS = ("warm_up", "learning_block", "regulation_break", "social_play", "closing_routine")
+
+def _plan_features_sql(row, source=""):
+    """SELECT of (date, feature) for session plan rows: `row` is NEW/OLD in a trigger, or the table
+    name with `source` its FROM clause."""
+    conditions = {"'any'": "1", f"'lead:' || {row}.lead_staff": f"TRIM(IFNULL({row}.lead_staff, '')) != ''"}
+    conditions.update({f"'block:{block}'": f"TRIM(IFNULL({row}.{block}, '')) != ''" for block in PLAN_BLOCKS})
+    return " UNION ALL ".join(f"SELECT {row}.date AS date, {feature} AS feature {source} WHERE {condition}"
+                              for feature, condition in conditions.items())
+
+def _plan_outcomes_upsert(select):
+    """Adds the signed counts selected as (feature, goal_area_id, sessions, regression, stable, progress)."""
+    return f'''INSERT INTO plan_outcomes (feature, goal_area_id, sessions, regression, stable, progress) {select}
+               ON CONFLICT (feature, goal_area_id) DO UPDATE SET
+                   sessions = sessions + excluded.sessions,
+                   regression = regression + excluded.regression,
+                   stable = stable + excluded.stable,
+                   progress = progress + excluded.progress;'''
+
+def _create_plan_outcome_triggers(c):
+    """Keeps plan_day_features and plan_outcomes current as progress entries and session plans change."""
+    # A progress entry counts for 'all' and for every feature of the plans on its date
+    def progress_row(row, sign):
+        status = f"{sign}1, {sign}({row}.status = 'Regression'), {sign}({row}.status = 'Stable'), {sign}({row}.status = 'Progress')"
+        return _plan_outcomes_upsert(
+            f"SELECT 'all', IFNULL({row}.goal_area_id, 0), {status} "
+            f"UNION ALL SELECT feature, IFNULL({row}.goal_area_id, 0), {status} "
+            f"FROM plan_day_features WHERE date = {row}.date")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_progress_plan_insert AFTER INSERT ON progress BEGIN {progress_row('NEW', '+')} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_progress_plan_delete AFTER DELETE ON progress BEGIN {progress_row('OLD', '-')} END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_progress_plan_update AFTER UPDATE OF date, goal_area_id, status ON progress "
+              f"BEGIN {progress_row('OLD', '-')} {progress_row('NEW', '+')} END")
+
+    # A plan day's outcomes count for a feature from the first plan with it that day to the last one removed
+    def day_outcomes(row, sign, plans_condition):
+        return _plan_outcomes_upsert(
+            f'''SELECT f.feature, IFNULL(d.goal_area_id, 0), {sign}SUM(d.sessions), {sign}SUM(d.regression),
+                      {sign}SUM(d.stable), {sign}SUM(d.progress)
+               FROM ({_plan_features_sql(row)}) AS f JOIN progress_daily AS d ON d.date = {row}.date
+               WHERE {plans_condition.format(feature="f.feature", date=f"{row}.date")}
+               GROUP BY f.feature, d.goal_area_id''')
+    add_plan = (day_outcomes("NEW", "+", "NOT EXISTS (SELECT 1 FROM plan_day_features AS p "
+                                         "WHERE p.date = {date} AND p.feature = {feature})")
+                + f'''INSERT INTO plan_day_features (date, feature, plans) SELECT date, feature, 1 FROM ({_plan_features_sql("NEW")})
+                       WHERE true ON CONFLICT (date, feature) DO UPDATE SET plans = plans + 1;''')
+    remove_plan = (f'''UPDATE plan_day_features SET plans = plans - 1
+                        WHERE date = OLD.date AND feature IN (SELECT feature FROM ({_plan_features_sql("OLD")}));'''
+                   + day_outcomes("OLD", "-", "EXISTS (SELECT 1 FROM plan_day_features AS p "
+                                              "WHERE p.date = {date} AND p.feature = {feature} AND p.plans <= 0)")
+                   + "DELETE FROM plan_day_features WHERE date = OLD.date AND plans <= 0;")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_session_plans_plan_insert AFTER INSERT ON session_plans BEGIN {add_plan} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_session_plans_plan_delete AFTER DELETE ON session_plans BEGIN {remove_plan} END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS trg_session_plans_plan_update "
+              f"AFTER UPDATE OF date, lead_staff, {', '.join(PLAN_BLOCKS)} ON session_plans BEGIN {remove_plan} {add_plan} END")
+
+def _migrate_plan_outcomes(c):
+    """v14: Joins session plans to progress by date in two trigger-maintained summaries for the analytics page.
+
+    plan_day_features counts the plans per date and feature; plan_outcomes holds the session and
+    status counts of every goal area for each feature over all time ('all' covers every entry).
+    """
+    c.execute('''CREATE TABLE IF NOT EXISTS plan_day_features (
+        date TEXT NOT NULL,
+        feature TEXT NOT NULL,
+        plans INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (date, feature)
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS plan_outcomes (
+        feature TEXT NOT NULL,
+        goal_area_id INTEGER NOT NULL,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        regression INTEGER NOT NULL DEFAULT 0,
+        stable INTEGER NOT NULL DEFAULT 0,
+        progress INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (feature, goal_area_id)
+    )''')
+    c.execute(f'''INSERT INTO plan_day_features (date, feature, plans)
+                  SELECT date, feature, COUNT(*) FROM ({_plan_features_sql("session_plans", "FROM session_plans")})
+                  WHERE date IS NOT NULL GROUP BY date, feature''')
+    c.execute(_plan_outcomes_upsert(
+        '''SELECT 'all', IFNULL(goal_area_id, 0), SUM(sessions), SUM(regression), SUM(stable), SUM(progress)
+           FROM progress_daily WHERE true GROUP BY goal_area_id
+           UNION ALL
+           SELECT f.feature, IFNULL(d.goal_area_id, 0), SUM(d.sessions), SUM(d.regression), SUM(d.stable), SUM(d.progress)
+           FROM plan_day_features AS f JOIN progress_daily AS d ON d.date = f.date
+           GROUP BY f.feature, d.goal_area_id'''))
+    _create_plan_outcome_triggers(c)
+
+def _migrate_password_hashes(c):
+    """v15: Hashes the passwords still stored in plaintext (older databases seeded the admin that way).
+
+    Logins upgrade such rows too, but an account nobody signs in to would otherwise keep its
+    plaintext password indefinitely.
+    """
+    rows = c.execute("SELECT username, password FROM users WHERE password IS NOT NULL AND password != ''").fetchall()
+    c.executemany("UPDATE users SET password=? WHERE username=?",
+                  [(hash_password(password), username) for username, password in rows if not is_hashed(password)])
+
+def _migrate_unknown_keys(c):
+    """v16: Points progress rows that an earlier v11 left without a child, discipline or goal area to UNKNOWN_NAME.
+
+    Their NULL keys never matched an existing progress_daily row, so the summary is rebuilt once
+    any were found.
+    """
+    fixed = 0
+    for key, table in PROGRESS_KEYS.items():
+        if not c.execute(f"SELECT 1 FROM progress WHERE {key} IS NULL LIMIT 1").fetchone():
+            continue
+        c.execute(f"INSERT OR IGNORE INTO {table} ({NAME_COLUMNS[table]}, archived) VALUES (?, 1)", (UNKNOWN_NAME,))
+        fixed += c.execute(f"UPDATE progress SET {key} = (SELECT id FROM {table} WHERE {NAME_COLUMNS[table]} = ?) "
+                           f"WHERE {key} IS NULL", (UNKNOWN_NAME,)).rowcount
+    if fixed:
+        c.execute("DELETE FROM progress_daily")
+        c.execute('''INSERT INTO progress_daily (child_id, discipline_id, goal_area_id, date, sessions, regression, stable, progress)
+                     SELECT child_id, discipline_id, goal_area_id, date, COUNT(*),
+                            SUM(status = 'Regression'), SUM(status = 'Stable'), SUM(status = 'Progress')
+                     FROM progress GROUP BY child_id, discipline_id, goal_area_id, date''')
+
+MIGRATIONS = [
+    _migrate_base_schema,
+    _migrate_indexes,
+    _migrate_iso_dates,
+    _migrate_progress_aggregates,
+    _migrate_reference_versions,
+    _migrate_media_derivatives,
+    _migrate_media_files,
+    _migrate_search_index,
+    _migrate_progress_mutations,
+    _migrate_jobs,
+    _migrate_integer_keys,
+    _migrate_directory_indexes,
+    _migrate_media_lifecycle,
+    _migrate_plan_outcomes,
+    _migrate_password_hashes,
+    _migrate_unknown_keys,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# --- CORE DB FUNCTIONS ---
+
+def _read_frame(conn, sql, params=()):
+    """Runs a query into a DataFrame. pandas is imported on first use, so the login screen never loads it."""
+    import pandas as pd
+    return pd.read_sql_query(sql, conn, params=params)
+
+def init_db():
+    """Brings the database schema up to date by applying any pending migrations."""
+    with _connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    with _transaction() as conn:
+        # Re-read under the write lock in case another session migrated in the meantime
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {number}")
+
+def get_user_record(username):
+    """Retrieves a user's stored login details (password hash, role, linked child id and name) or None."""
+    with _connection() as conn:
+        user = conn.execute('''SELECT users.username, users.password, users.role, users.child_id, children.child_name
+                               FROM users LEFT JOIN children ON children.id = users.child_id
+                               WHERE users.username=?''', (username,)).fetchone()
     if user:
-        # Returns: (username, password, role, child_link)
-        return {"username": user[0], "password": user[1], "role": user[2], "child_link": user[3]}
+        return {"username": user[0], "password": user[1], "role": user[2], "child_id": user[3], "child_name": user[4]}
     return None
 
+def set_password_hash(username, password_hash):
+    """Stores an already-hashed password (used when upgrading legacy plaintext rows)."""
+    with _transaction() as conn:
+        conn.execute("UPDATE users SET password=? WHERE username=?", (password_hash, username))
+
+# Reference lists as the app shows them: archived entries are left out, and users and children
+# carry each other's names for display. Password hashes stay out of them: only get_user_record reads those.
+LIST_QUERIES = {
+    "users": '''SELECT users.username, users.role, users.child_id, children.child_name
+                FROM users LEFT JOIN children ON children.id = users.child_id ORDER BY users.username''',
+    "children": '''SELECT id, child_name, date_of_birth,
+                          (SELECT MIN(username) FROM users WHERE users.child_id = children.id) AS parent_username
+                   FROM children WHERE archived = 0 ORDER BY child_name''',
+    "disciplines": "SELECT id, name FROM disciplines WHERE archived = 0 ORDER BY id",
+    "goal_areas": "SELECT id, name FROM goal_areas WHERE archived = 0 ORDER BY id",
+}
+
 def get_list_data(table_name):
-    """Retrieves all data from a list table (disciplines, goal_areas, children, users)."""
-    conn = sqlite3.connect(DB_NAME)
-    df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-    conn.close()
-    return df
+    """Retrieves a reference list (disciplines, goal_areas, children, users) including the row ids."""
+    with _connection() as conn:
+        return _read_frame(conn, LIST_QUERIES[table_name])
 
 # --- CRUD Functions for Admin Tools ---
 
-def upsert_user(username, password, role, child_link):
-    """Inserts or updates a user. Password field is only updated if provided."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    if password:
-        c.execute("REPLACE INTO users (username, password, role, child_link) VALUES (?, ?, ?, ?)",
-                  (username, password, role, child_link))
-    else:
-        # If password is None, keep the existing password
-        c.execute("UPDATE users SET role=?, child_link=? WHERE username=?",
-                  (role, child_link, username))
-        c.execute("INSERT OR IGNORE INTO users (username, role, child_link) VALUES (?, ?, ?)",
-                  (username, role, child_link)) # Should only happen if password was null
-    conn.commit()
-    conn.close()
+def upsert_user(username, password, role, child_id=None):
+    """Inserts or updates a user. Password field is only updated if provided (and is stored hashed).
+
+    `child_id` links a parent login to their child; staff accounts have none.
+    """
+    if password and not is_hashed(password):
+        password = hash_password(password)
+    with _transaction() as conn:
+        if password:
+            conn.execute("REPLACE INTO users (username, password, role, child_id) VALUES (?, ?, ?, ?)",
+                         (username, password, role, child_id))
+        else:
+            # If password is None, keep the existing password
+            conn.execute("UPDATE users SET role=?, child_id=? WHERE username=?",
+                         (role, child_id, username))
+            conn.execute("INSERT OR IGNORE INTO users (username, role, child_id) VALUES (?, ?, ?)",
+                         (username, role, child_id)) # Should only happen if password was null
 
 def delete_user(username):
     """Deletes a user."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM users WHERE username=?", (username,))
-    conn.commit()
-    conn.close()
-
-def upsert_child(child_name, parent_username, date_of_birth=None):
-    """Inserts or updates a child profile."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # This uses INSERT OR REPLACE to simplify upsert logic on the child_name UNIQUE key
-    c.execute("INSERT OR REPLACE INTO children (child_name, parent_username, date_of_birth) VALUES (?, ?, ?)",
-              (child_name, parent_username, date_of_birth))
-    conn.commit()
-    conn.close()
-
-def delete_child(child_name):
-    """Deletes a child and removes their parent link from the users table."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # 1. Find the parent username to clear the child_link
-    c.execute("SELECT parent_username FROM children WHERE child_name=?", (child_name,))
-    parent = c.fetchone()
-    if parent and parent[0] != 'None':
-        # 2. Unlink the parent's child_link (set it to 'All' for safety/simplification)
-        c.execute("UPDATE users SET child_link='All' WHERE username=? AND child_link=?", (parent[0], child_name))
-        
-    # 3. Delete the child record
-    c.execute("DELETE FROM children WHERE child_name=?", (child_name,))
-    conn.commit()
-    conn.close()
+    with _transaction() as conn:
+        conn.execute("DELETE FROM users WHERE username=?", (username,))
+
+def _delete_or_archive(conn, table_name, item_id):
+    """Deletes a reference row, or archives it (hidden from the lists) while progress rows still use it."""
+    key = next(key for key, table in PROGRESS_KEYS.items() if table == table_name)
+    if conn.execute(f"SELECT 1 FROM progress WHERE {key}=? LIMIT 1", (item_id,)).fetchone():
+        conn.execute(f"UPDATE {table_name} SET archived=1 WHERE id=?", (item_id,))
+    else:
+        conn.execute(f"DELETE FROM {table_name} WHERE id=?", (item_id,))
+
+def upsert_child(child_name, date_of_birth=None, child_id=None):
+    """Inserts or updates a child profile and returns its id.
+
+    With `child_id` the profile is updated in place, which renames the child everywhere at once.
+    Adding the name of an archived child restores that profile.
+    """
+    with _transaction() as conn:
+        if child_id:
+            conn.execute("UPDATE children SET child_name=?, date_of_birth=?, archived=0 WHERE id=?",
+                         (child_name, date_of_birth, child_id))
+            return child_id
+        conn.execute('''INSERT INTO children (child_name, date_of_birth) VALUES (?, ?)
+                        ON CONFLICT (child_name) DO UPDATE SET date_of_birth=excluded.date_of_birth, archived=0''',
+                     (child_name, date_of_birth))
+        return conn.execute("SELECT id FROM children WHERE child_name=?", (child_name,)).fetchone()[0]
+
+def _parent_link_sql(child_id_sql):
+    """(unlink, link) statements for a child's parent login, both taking (child id, parent_username).
+
+    `child_id_sql` is the SQL for the child's id, e.g. "?" or a lookup by name.
+    """
+    return (f"UPDATE users SET child_id=NULL WHERE child_id={child_id_sql} AND username IS NOT ?",
+            f"UPDATE users SET child_id={child_id_sql} WHERE username=?")
+
+def set_child_parent(child_id, parent_username):
+    """Links a child to one parent login (None unlinks); any other login linked to the child is unlinked."""
+    unlink, link = _parent_link_sql("?")
+    with _transaction() as conn:
+        conn.execute(unlink, (child_id, parent_username))
+        if parent_username:
+            conn.execute(link, (child_id, parent_username))
+
+def delete_child(child_id):
+    """Deletes a child and removes their parent link. A child with progress entries is archived instead."""
+    with _transaction() as conn:
+        conn.execute("UPDATE users SET child_id=NULL WHERE child_id=?", (child_id,))
+        _delete_or_archive(conn, "children", child_id)
 
 def upsert_list_item(table_name, item_name):
-    """Adds a new item to a custom list (disciplines or goal_areas)."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+    """Adds a new item to a custom list (disciplines or goal_areas), restoring it if it was archived."""
     try:
-        c.execute(f"INSERT OR IGNORE INTO {table_name} (name) VALUES (?)", (item_name,))
-        conn.commit()
+        with _transaction() as conn:
+            conn.execute(f"INSERT INTO {table_name} (name) VALUES (?) ON CONFLICT (name) DO UPDATE SET archived=0",
+                         (item_name,))
     except sqlite3.OperationalError:
         pass
-    conn.close()
 
-def delete_list_item(table_name, item_name):
-    """Deletes an item from a custom list."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute(f"DELETE FROM {table_name} WHERE name=?", (item_name,))
-    conn.commit()
-    conn.close()
+def rename_list_item(table_name, item_id, new_name):
+    """Renames a custom list item; progress rows refer to it by id, so this is a single-row update."""
+    with _transaction() as conn:
+        conn.execute(f"UPDATE {table_name} SET name=? WHERE id=?", (new_name, item_id))
+
+def delete_list_item(table_name, item_id):
+    """Deletes an item from a custom list (archived instead while progress entries use it)."""
+    with _transaction() as conn:
+        _delete_or_archive(conn, table_name, item_id)
+
+# --- Admin Directory (prefix search and pagination over users and children) ---
+
+DIRECTORY_PAGE_SIZE = 25
+
+def _prefix_pattern(text):
+    """LIKE pattern for values starting with `text`; its own % and _ are matched literally."""
+    return re.sub(r"([\\%_])", r"\\\1", (text or "").strip()) + "%"
+
+def search_users(prefix="", role=None, unlinked=False, limit=DIRECTORY_PAGE_SIZE, offset=0):
+    """Returns (page of users whose username starts with `prefix`, total matches), ordered by username.
+
+    Matching ignores case and uses idx_users_username_nocase. `unlinked` keeps only logins without a child.
+    """
+    where, params = ["users.username LIKE ? ESCAPE '\\'"], [_prefix_pattern(prefix)]
+    if role:
+        where.append("users.role = ?")
+        params.append(role)
+    if unlinked:
+        where.append("users.child_id IS NULL")
+    where = " AND ".join(where)
+    sql = f'''SELECT users.username, users.role, users.child_id, children.child_name
+              FROM users LEFT JOIN children ON children.id = users.child_id
+              WHERE {where} ORDER BY users.username COLLATE NOCASE LIMIT ? OFFSET ?'''
+    with _connection() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM users WHERE {where}", params).fetchone()[0]
+        return _read_frame(conn, sql, params + [limit, offset]), total
+
+def search_children(prefix="", unlinked=False, limit=DIRECTORY_PAGE_SIZE, offset=0):
+    """Returns (page of active children whose name starts with `prefix`, total matches), ordered by name.
+
+    Matching ignores case and uses idx_children_name_nocase. `unlinked` keeps only children without a parent login.
+    """
+    where, params = ["archived = 0", "child_name LIKE ? ESCAPE '\\'"], [_prefix_pattern(prefix)]
+    if unlinked:
+        where.append("NOT EXISTS (SELECT 1 FROM users WHERE users.child_id = children.id)")
+    where = " AND ".join(where)
+    sql = f'''SELECT id, child_name, date_of_birth,
+                     (SELECT MIN(username) FROM users WHERE users.child_id = children.id) AS parent_username
+              FROM children WHERE {where} ORDER BY child_name COLLATE NOCASE LIMIT ? OFFSET ?'''
+    with _connection() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM children WHERE {where}", params).fetchone()[0]
+        return _read_frame(conn, sql, params + [limit, offset]), total
+
+def get_child_record(child_id):
+    """Retrieves one child profile (id, name, date of birth, linked parent login) or None."""
+    with _connection() as conn:
+        child = conn.execute('''SELECT id, child_name, date_of_birth,
+                                        (SELECT MIN(username) FROM users WHERE users.child_id = children.id)
+                                 FROM children WHERE id=?''', (child_id,)).fetchone()
+    if child:
+        return {"id": child[0], "child_name": child[1], "date_of_birth": child[2], "parent_username": child[3]}
+    return None
 
 # --- Existing Progress/Planner Functions ---
 
-def save_progress(date, child, discipline, goal, status, notes, media_path):
-    """Saves progress with the new media_path column."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("INSERT INTO progress (date, child_name, discipline, goal_area, status, notes, media_path) VALUES (?, ?, ?, ?, ?, ?, ?)",
-              (date, child, discipline, goal, status, notes, media_path))
-    conn.commit()
-    conn.close()
+def save_progress(date, child_id, discipline_id, goal_area_id, status, notes, media_path, media_id=None):
+    """Saves progress with the new media_path column (media_id links its media_files metadata). Returns the new row id."""
+    with _transaction() as conn:
+        cursor = conn.execute("INSERT INTO progress (date, child_id, discipline_id, goal_area_id, status, notes, media_path, media_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              (date, child_id, discipline_id, goal_area_id, status, notes, media_path, media_id))
+        return cursor.lastrowid
+
+def save_progress_batch(entries):
+    """Saves several progress entries (dicts with the save_progress argument names) in one transaction.
+
+    Either every entry is saved or none is. Returns the new row ids in the order given.
+    """
+    sql = ("INSERT INTO progress (date, child_id, discipline_id, goal_area_id, status, notes, media_path, media_id) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+    with _transaction() as conn:
+        return [conn.execute(sql, (e["date"], e["child_id"], e["discipline_id"], e["goal_area_id"], e["status"],
+                                   e.get("notes", ""), e.get("media_path", ""), e.get("media_id"))).lastrowid
+                for e in entries]
+
+def register_media(sha256, path, size_bytes, mime_type):
+    """Records a stored media file (once per content hash) and returns its media_files id."""
+    with _transaction() as conn:
+        conn.execute("INSERT OR IGNORE INTO media_files (sha256, path, size_bytes, mime_type, created_at) VALUES (?, ?, ?, ?, ?)",
+                     (sha256, path, size_bytes, mime_type, datetime.now().isoformat(timespec="seconds")))
+        return conn.execute("SELECT id FROM media_files WHERE sha256=?", (sha256,)).fetchone()[0]
+
+def get_media_by_hash(sha256):
+    """Returns the media_files row for a content hash as a dict, or None."""
+    with _connection() as conn:
+        row = conn.execute("SELECT id, sha256, path, size_bytes, mime_type FROM media_files WHERE sha256=?", (sha256,)).fetchone()
+    if row:
+        return {"id": row[0], "sha256": row[1], "path": row[2], "size_bytes": row[3], "mime_type": row[4]}
+    return None
+
+def set_media_derivatives(progress_id, thumb_path, preview_path):
+    """Records the thumbnail/preview generated for a progress entry's media."""
+    with _transaction() as conn:
+        conn.execute("UPDATE progress SET thumb_path=?, preview_path=? WHERE id=?",
+                     (thumb_path, preview_path, progress_id))
 
 def save_plan(date, lead_staff, support_staff, warm_up, learning_block, regulation_break, social_play, closing_routine, materials_needed, internal_notes):
     """Saves a new daily session plan entry."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''INSERT INTO session_plans (date, lead_staff, support_staff, warm_up, learning_block, regulation_break, social_play, closing_routine, materials_needed, internal_notes) 
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-              (date, lead_staff, support_staff, warm_up, learning_block, regulation_break, social_play, closing_routine, materials_needed, internal_notes))
-    conn.commit()
-    conn.close()
+    with _transaction() as conn:
+        conn.execute('''INSERT INTO session_plans (date, lead_staff, support_staff, warm_up, learning_block, regulation_break, social_play, closing_routine, materials_needed, internal_notes) 
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                     (date, lead_staff, support_staff, warm_up, learning_block, regulation_break, social_play, closing_routine, materials_needed, internal_notes))
+
+# --- Progress Queries (filtering, ordering and pagination happen in SQL) ---
+
+FEED_PAGE_SIZE = 50
+
+def _iso(value):
+    """Accepts a date/datetime/Timestamp or an ISO string and returns the ISO date string stored in the DB."""
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+# Low-cardinality text columns are returned as categoricals (one small int code per row)
+CATEGORY_COLUMNS = ("child_name", "discipline", "goal_area", "status")
+
+def _typed(df):
+    """Converts a progress frame in place to compact dtypes and returns it.
+
+    date becomes datetime64, the CATEGORY_COLUMNS become categoricals and, when status is present,
+    an int8 status_code (1=Regression, 2=Stable, 3=Progress, 0=unknown) is added.
+    """
+    import pandas as pd
+    if "date" in df:
+        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", errors="coerce")
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("category")
+    if "status" in df:
+        df["status_code"] = df["status"].map(STATUS_SCORES).astype("float").fillna(0).astype("int8")
+    return df
+
+def _progress_filters(child_id=None, start_date=None, end_date=None, discipline_id=None, goal_area_id=None):
+    """Builds the WHERE clause and parameters shared by all progress queries (integer key comparisons)."""
+    clauses, params = [], []
+    if child_id:
+        clauses.append("child_id = ?")
+        params.append(child_id)
+    if start_date:
+        clauses.append("date >= ?")
+        params.append(_iso(start_date))
+    if end_date:
+        clauses.append("date <= ?")
+        params.append(_iso(end_date))
+    if discipline_id:
+        clauses.append("discipline_id = ?")
+        params.append(discipline_id)
+    if goal_area_id:
+        clauses.append("goal_area_id = ?")
+        params.append(goal_area_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+def query_progress(columns="*", order="desc", limit=None, offset=0, **filters):
+    """Retrieves progress rows matching the filters (child_id, start_date, end_date, discipline_id, goal_area_id).
+
+    Rows carry both the keys and the child, discipline and goal area names. They are ordered by date
+    (then id) in the requested direction; limit/offset paginate in SQL. Dates come back as
+    datetime64 and the low-cardinality columns as categoricals (see _typed).
+    """
+    where, params = _progress_filters(**filters)
+    direction = "ASC" if order == "asc" else "DESC"
+    sql = f"SELECT {columns} FROM progress_named {where} ORDER BY date {direction}, id {direction}"
+    if limit:
+        sql += " LIMIT ? OFFSET ?"
+        params += [limit, offset]
+    with _connection() as conn:
+        return _typed(_read_frame(conn, sql, params))
+
+def count_progress(**filters):
+    """Counts progress rows matching the filters without loading them."""
+    where, params = _progress_filters(**filters)
+    with _connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM progress {where}", params).fetchone()[0]
+
+def get_progress_fingerprint(**filters):
+    """Returns a short string that changes whenever the filtered progress rows change.
+
+    Combines the row count, highest id and number of generated thumbnails with the global
+    progress_mutations counter (edits and deletes), so it is cheap enough to check per child.
+    """
+    where, params = _progress_filters(**filters)
+    with _connection() as conn:
+        count, max_id, thumbs = conn.execute(
+            f"SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM(thumb_path != ''), 0) FROM progress {where}",
+            params).fetchone()
+        mutations = conn.execute("SELECT version FROM data_versions WHERE name = 'progress_mutations'").fetchone()[0]
+    return f"{count}-{max_id}-{thumbs}-{mutations}"
+
+def get_progress_page(cursor=None, page_size=FEED_PAGE_SIZE, **filters):
+    """Returns one page of the newest-first notes feed using keyset pagination.
+
+    `cursor` is the (date, id) of the last row of the previous page, or None for the first page.
+    Returns (DataFrame, next_cursor); next_cursor is None when there are no older rows.
+    """
+    where, params = _progress_filters(**filters)
+    if cursor:
+        keyset = "(date < ? OR (date = ? AND progress.id < ?))"
+        where = f"{where} AND {keyset}" if where else f"WHERE {keyset}"
+        params += [cursor[0], cursor[0], cursor[1]]
+    # Media metadata comes along with the page, so the feed needs no filesystem checks per row
+    sql = f'''SELECT progress.*, media_files.path AS media_file, media_files.mime_type AS media_mime,
+                     media_files.size_bytes AS media_size
+              FROM progress_named AS progress LEFT JOIN media_files ON media_files.id = progress.media_id
+              {where} ORDER BY date DESC, progress.id DESC LIMIT ?'''
+    with _connection() as conn:
+        # Fetch one extra row to know whether another page exists
+        df = _typed(_read_frame(conn, sql, params + [page_size + 1]))
+    if len(df) <= page_size:
+        return df, None
+    df = df.iloc[:page_size]
+    last = df.iloc[-1]
+    return df, (_iso(last["date"]), int(last["id"]))
+
+def get_progress_children():
+    """Returns {child id: name}, ordered by name, for the children that have progress entries."""
+    with _connection() as conn:
+        rows = conn.execute('''SELECT id, child_name FROM children
+                               WHERE EXISTS (SELECT 1 FROM progress WHERE progress.child_id = children.id)
+                               ORDER BY child_name''').fetchall()
+    return dict(rows)
+
+# --- Progress Aggregates (read from the trigger-maintained progress_daily summary) ---
+
+STATUS_SCORES = {"Regression": 1, "Stable": 2, "Progress": 3}
+
+def get_data_version(name="progress"):
+    """Returns the write counter for a table; it changes whenever the table's rows change."""
+    with _connection() as conn:
+        row = conn.execute("SELECT version FROM data_versions WHERE name=?", (name,)).fetchone()
+    return row[0] if row else 0
+
+def get_data_versions():
+    """Returns every table's write counter as a dict (one cheap query for all cached lists)."""
+    with _connection() as conn:
+        return dict(conn.execute("SELECT name, version FROM data_versions").fetchall())
+
+def get_progress_summary(**filters):
+    """Returns the dashboard headline metrics for the filtered progress rows.
+
+    Result keys: total, progress_count, success_rate (0-100) and latest_status (None if no rows).
+    """
+    where, params = _progress_filters(**filters)
+    with _connection() as conn:
+        total, progress_count = conn.execute(
+            f"SELECT COALESCE(SUM(sessions), 0), COALESCE(SUM(progress), 0) FROM progress_daily {where}", params).fetchone()
+        latest = conn.execute(
+            f"SELECT status FROM progress {where} ORDER BY date DESC, id DESC LIMIT 1", params).fetchone()
+    return {
+        "total": total,
+        "progress_count": progress_count,
+        "success_rate": round(progress_count / total * 100) if total else 0,
+        "latest_status": latest[0] if latest else None,
+    }
+
+DAILY_GOAL_STATUS_SQL = '''SELECT date, goal_areas.name AS goal_area, SUM(sessions) AS sessions,
+                                 SUM(regression) AS regression, SUM(stable) AS stable, SUM(progress) AS progress,
+                                 (SUM(regression) * 1.0 + SUM(stable) * 2 + SUM(progress) * 3) / SUM(sessions) AS mean_status
+                          FROM progress_daily LEFT JOIN goal_areas ON goal_areas.id = progress_daily.goal_area_id
+                          {where}
+                          GROUP BY date, goal_area_id
+                          ORDER BY date, goal_area'''
+
+def get_daily_goal_status(**filters):
+    """Returns one row per (date, goal_area) with session counts and the mean status score (1-3)."""
+    where, params = _progress_filters(**filters)
+    with _connection() as conn:
+        return _typed(_read_frame(conn, DAILY_GOAL_STATUS_SQL.format(where=where), params))
+
+def get_progress_snapshot(**filters):
+    """Reads everything the dashboard aggregates need in one consistent read transaction.
+
+    Returns a dict with "daily" (as get_daily_goal_status), "total", "progress_count", "latest"
+    ((Timestamp, id, status) of the newest row, or None), "last_id" (highest progress id) and
+    "mutations" (the progress_mutations counter). Later inserts can be folded in with
+    get_progress_since(last_id).
+    """
+    import pandas as pd
+    where, params = _progress_filters(**filters)
+    with _connection() as conn:
+        conn.execute("BEGIN")
+        daily = _typed(_read_frame(conn, DAILY_GOAL_STATUS_SQL.format(where=where), params))
+        latest = conn.execute(
+            f"SELECT date, id, status FROM progress {where} ORDER BY date DESC, id DESC LIMIT 1", params).fetchone()
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM progress").fetchone()[0]
+        mutations = conn.execute("SELECT version FROM data_versions WHERE name = 'progress_mutations'").fetchone()[0]
+        conn.rollback()
+    return {
+        "daily": daily,
+        "total": int(daily["sessions"].sum()),
+        "progress_count": int(daily["progress"].sum()),
+        "latest": (pd.Timestamp(latest[0]), latest[1], latest[2]) if latest else None,
+        "last_id": last_id,
+        "mutations": mutations,
+    }
+
+def get_progress_since(last_id, **filters):
+    """Returns (rows added after `last_id`, new last id, progress_mutations counter).
+
+    Rows have id, date, goal_area and status. Reads only the new tail of the table through the
+    primary key, so it stays cheap however large the table grows. If the counter differs from the
+    snapshot's, rows were edited or deleted and the caller must take a fresh snapshot instead.
+    """
+    where, params = _progress_filters(**filters)
+    where = f"{where} AND id > ?" if where else "WHERE id > ?"
+    with _connection() as conn:
+        conn.execute("BEGIN")
+        rows = _typed(_read_frame(conn, f"SELECT id, date, goal_area, status FROM progress_named {where} ORDER BY id",
+                                   params + [last_id]))
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM progress").fetchone()[0]
+        mutations = conn.execute("SELECT version FROM data_versions WHERE name = 'progress_mutations'").fetchone()[0]
+        conn.rollback()
+    return rows, last_id, mutations
+
+# --- Planner Queries ---
+
+def get_session_plans(start_date=None, end_date=None, limit=None, offset=0):
+    """Retrieves session plans (newest first), optionally limited to a date range and paginated."""
+    clauses, params = [], []
+    if start_date:
+        clauses.append("date >= ?")
+        params.append(_iso(start_date))
+    if end_date:
+        clauses.append("date <= ?")
+        params.append(_iso(end_date))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"SELECT * FROM session_plans {where} ORDER BY date DESC, id DESC"
+    if limit:
+        sql += " LIMIT ? OFFSET ?"
+        params += [limit, offset]
+    with _connection() as conn:
+        return _read_frame(conn, sql, params)
+
+# --- Plan Outcome Analytics (read from the trigger-maintained plan_outcomes summary) ---
+
+def get_plan_outcomes(start_date=None, end_date=None):
+    """Returns session and status counts per (plan feature, goal area), with the number of plan days per feature.
+
+    Features are 'all' (every entry), 'any' (days with a session plan), 'lead:<staff>' and
+    'block:<column>'. All-time figures come straight from plan_outcomes; a date range joins the
+    plan_day_features and progress_daily summaries for that range instead.
+    """
+    ranges = [(op, _iso(value)) for op, value in ((">=", start_date), ("<=", end_date)) if value]
+    params = [value for _, value in ranges]
+
+    def where(column):
+        return f"WHERE {' AND '.join(f'{column} {op} ?' for op, _ in ranges)}" if ranges else ""
+
+    if ranges:
+        outcomes = f'''SELECT 'all' AS feature, IFNULL(goal_area_id, 0) AS goal_area_id, SUM(sessions) AS sessions,
+                               SUM(regression) AS regression, SUM(stable) AS stable, SUM(progress) AS progress
+                        FROM progress_daily {where("date")} GROUP BY goal_area_id
+                        UNION ALL
+                        SELECT f.feature, IFNULL(d.goal_area_id, 0), SUM(d.sessions), SUM(d.regression), SUM(d.stable),
+                               SUM(d.progress)
+                        FROM plan_day_features AS f JOIN progress_daily AS d ON d.date = f.date {where("f.date")}
+                        GROUP BY f.feature, d.goal_area_id'''
+        params = params * 3
+    else:
+        outcomes = "SELECT * FROM plan_outcomes"
+    sql = f'''SELECT o.feature, goal_areas.name AS goal_area, o.sessions, o.regression, o.stable, o.progress,
+                     days.days AS plan_days
+              FROM ({outcomes}) AS o
+              LEFT JOIN goal_areas ON goal_areas.id = o.goal_area_id
+              LEFT JOIN (SELECT feature, COUNT(*) AS days FROM plan_day_features {where("date")}
+                         GROUP BY feature) AS days ON days.feature = o.feature
+              WHERE o.sessions > 0 ORDER BY o.feature, goal_area'''
+    with _connection() as conn:
+        return _read_frame(conn, sql, params)
+
+# --- Full-Text Search ---
+
+SEARCH_PAGE_SIZE = 20
+# Control characters mark highlighted terms so the page can escape the text before styling matches
+HIGHLIGHT_START, HIGHLIGHT_END = "\x02", "\x03"
+
+def _fts_query(text):
+    """Turns free text into a safe FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def search_progress_notes(text, child_id=None, limit=SEARCH_PAGE_SIZE, offset=0):
+    """Ranks progress notes matching the search text (best first). Returns (DataFrame, total matches).
+
+    The "snippet" column holds the matching part of the note with HIGHLIGHT_START/END around hits.
+    """
+    import pandas as pd
+    match = _fts_query(text)
+    if match is None:
+        return pd.DataFrame(), 0
+    where, params = "progress_fts MATCH ?", [match]
+    if child_id:
+        where += " AND progress.child_id = ?"
+        params.append(child_id)
+    sql = f'''SELECT progress.id, progress.date, progress.child_name, progress.discipline, progress.goal_area,
+                     progress.status, snippet(progress_fts, 0, ?, ?, '…', 24) AS snippet
+              FROM progress_fts JOIN progress_named AS progress ON progress.id = progress_fts.rowid
+              WHERE {where} ORDER BY bm25(progress_fts), progress.date DESC LIMIT ? OFFSET ?'''
+    with _connection() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM progress_fts JOIN progress ON progress.id = progress_fts.rowid "
+                             f"WHERE {where}", params).fetchone()[0]
+        df = _read_frame(conn, sql, [HIGHLIGHT_START, HIGHLIGHT_END] + params + [limit, offset])
+    return df, total
+
+def search_session_plans(text, limit=SEARCH_PAGE_SIZE, offset=0):
+    """Ranks session plans whose text blocks match the search text. Returns (DataFrame, total matches).
+
+    "snippet" is taken from the best-matching block; "block" names the first block that matches.
+    """
+    import pandas as pd
+    match = _fts_query(text)
+    if match is None:
+        return pd.DataFrame(), 0
+    # A block matched if its highlighted text contains a marker; only computed for the returned page
+    marked = ", ".join(f"instr(highlight(session_plans_fts, {i}, '{HIGHLIGHT_START}', ''), '{HIGHLIGHT_START}') > 0 AS {col}"
+                       for i, col in enumerate(SEARCH_PLAN_COLUMNS))
+    sql = f'''SELECT session_plans.id, session_plans.date, session_plans.lead_staff,
+                     snippet(session_plans_fts, -1, ?, ?, '…', 24) AS snippet, {marked}
+              FROM session_plans_fts JOIN session_plans ON session_plans.id = session_plans_fts.rowid
+              WHERE session_plans_fts MATCH ? ORDER BY bm25(session_plans_fts), session_plans.date DESC
+              LIMIT ? OFFSET ?'''
+    with _connection() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM session_plans_fts WHERE session_plans_fts MATCH ?", (match,)).fetchone()[0]
+        df = _read_frame(conn, sql, [HIGHLIGHT_START, HIGHLIGHT_END, match, limit, offset])
+    flags = df[list(SEARCH_PLAN_COLUMNS)].astype(bool)
+    df["block"] = flags.idxmax(axis=1).where(flags.any(axis=1), "")
+    return df.drop(columns=list(SEARCH_PLAN_COLUMNS)), total
+
+# --- Media Lifecycle (see media_lifecycle.py) ---
+
+MEDIA_SCAN_BATCH_SIZE = 1000
+MEDIA_COLUMNS = ("id", "sha256", "path", "size_bytes", "mime_type", "created_at", "tier")
+
+# Every file path a progress entry shows: the original (through media_files or the legacy media_path)
+# and its derivatives. media_files rows no entry links to are not included.
+REFERENCED_MEDIA_SQL = '''SELECT media_path FROM progress WHERE media_path != ''
+                          UNION ALL SELECT thumb_path FROM progress WHERE thumb_path != ''
+                          UNION ALL SELECT preview_path FROM progress WHERE preview_path != ''
+                          UNION ALL SELECT path FROM media_files WHERE path IS NOT NULL
+                              AND id IN (SELECT media_id FROM progress WHERE media_id IS NOT NULL)'''
+
+def find_unreferenced_media(files):
+    """Returns the (path, size_bytes, mtime) tuples from `files` that no progress entry uses.
+
+    `files` can be a generator over a directory scan: it is loaded into a temporary table in batches
+    and reconciled with one set-based query, so neither side is held in Python memory.
+    """
+    files = iter(files)
+    with _connection() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS media_scan (path TEXT PRIMARY KEY, size_bytes INTEGER, mtime REAL)")
+        try:
+            while True:
+                batch = [row for _, row in zip(range(MEDIA_SCAN_BATCH_SIZE), files)]
+                if not batch:
+                    break
+                conn.executemany("INSERT OR IGNORE INTO media_scan (path, size_bytes, mtime) VALUES (?, ?, ?)", batch)
+            return conn.execute(f"SELECT path, size_bytes, mtime FROM media_scan "
+                                f"WHERE path NOT IN ({REFERENCED_MEDIA_SQL}) ORDER BY path").fetchall()
+        finally:
+            conn.execute("DROP TABLE IF EXISTS temp.media_scan")
+
+def delete_orphan_media_records(created_before, dry_run=False):
+    """Deletes media_files rows registered before `created_before` that no progress entry links to
+    (e.g. an upload whose entry failed to save). Returns them as dicts; `dry_run` only lists them."""
+    where = '''created_at < ? AND id NOT IN (SELECT media_id FROM progress WHERE media_id IS NOT NULL)
+               AND (path IS NULL OR path NOT IN (SELECT media_path FROM progress WHERE media_path != ''))'''
+    with _transaction() as conn:
+        rows = conn.execute(f"SELECT {', '.join(MEDIA_COLUMNS)} FROM media_files WHERE {where}", (created_before,)).fetchall()
+        if not dry_run:
+            conn.execute(f"DELETE FROM media_files WHERE {where}", (created_before,))
+    return [dict(zip(MEDIA_COLUMNS, row)) for row in rows]
+
+def get_media_due(tiers, created_before, limit=None):
+    """Returns linked media_files rows (dicts, oldest first) in one of `tiers` registered before the cutoff."""
+    sql = f'''SELECT {', '.join(MEDIA_COLUMNS)} FROM media_files
+              WHERE tier IN ({', '.join('?' * len(tiers))}) AND created_at < ?
+                  AND id IN (SELECT media_id FROM progress WHERE media_id IS NOT NULL)
+              ORDER BY created_at LIMIT ?'''
+    with _connection() as conn:
+        rows = conn.execute(sql, (*tiers, created_before, -1 if limit is None else limit)).fetchall()
+    return [dict(zip(MEDIA_COLUMNS, row)) for row in rows]
+
+def set_media_tier(media_id, path, size_bytes, mime_type, tier):
+    """Records a media file's new location, size and tier, and points its progress entries at the new path.
+
+    The size as uploaded is kept in original_size_bytes the first time the file changes.
+    """
+    with _transaction() as conn:
+        conn.execute('''UPDATE media_files SET original_size_bytes = COALESCE(original_size_bytes, size_bytes),
+                            path=?, size_bytes=?, mime_type=?, tier=? WHERE id=?''',
+                     (path, size_bytes, mime_type, tier, media_id))
+        conn.execute("UPDATE progress SET media_path=? WHERE media_id=? AND media_path IS NOT ?", (path, media_id, path))
+
+def get_media_storage_summary():
+    """Returns {tier: {"files", "bytes", "original_bytes"}} over all registered media."""
+    with _connection() as conn:
+        rows = conn.execute('''SELECT tier, COUNT(*), COALESCE(SUM(size_bytes), 0),
+                                       COALESCE(SUM(COALESCE(original_size_bytes, size_bytes)), 0)
+                                FROM media_files GROUP BY tier ORDER BY tier''').fetchall()
+    return {tier: {"files": files, "bytes": size, "original_bytes": original} for tier, files, size, original in rows}
+
+# --- Background Jobs ---
+
+JOB_COLUMNS = ("id", "kind", "params", "owner", "status", "result", "error", "created_at", "started_at", "finished_at")
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+def create_job(kind, params, owner=None):
+    """Queues a job row (params already JSON-encoded) and returns its id."""
+    with _transaction() as conn:
+        c = conn.execute("INSERT INTO jobs (kind, params, owner, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                         (kind, params, owner, _now()))
+        return c.lastrowid
+
+def start_job(job_id):
+    """Marks a queued job as running. Returns False if it was already taken or cancelled."""
+    with _transaction() as conn:
+        c = conn.execute("UPDATE jobs SET status='running', started_at=? WHERE id=? AND status='queued'", (_now(), job_id))
+        return c.rowcount == 1
+
+def finish_job(job_id, result=None, error=None):
+    """Stores a job's JSON result (status 'done') or its error message (status 'failed')."""
+    with _transaction() as conn:
+        conn.execute("UPDATE jobs SET status=?, result=?, error=?, finished_at=? WHERE id=?",
+                     ("failed" if error else "done", result, error, _now(), job_id))
+
+def get_job(job_id):
+    """Returns one job as a dict, or None."""
+    with _connection() as conn:
+        row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id=?", (job_id,)).fetchone()
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+def list_jobs(owner=None, kind=None, limit=20):
+    """Returns the newest jobs (dicts), optionally for one owner and/or kind."""
+    clauses, params = [], []
+    if owner:
+        clauses.append("owner = ?")
+        params.append(owner)
+    if kind:
+        clauses.append("kind = ?")
+        params.append(kind)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with _connection() as conn:
+        rows = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs {where} ORDER BY id DESC LIMIT ?",
+                            params + [limit]).fetchall()
+    return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+def recover_jobs(max_age_days=7):
+    """Prepares the job table at server start and returns the ids of jobs still queued.
+
+    Jobs left running by the previous process are marked failed, and finished jobs older than
+    `max_age_days` are deleted.
+    """
+    with _transaction() as conn:
+        conn.execute("UPDATE jobs SET status='failed', error='Interrupted by a server restart', finished_at=? "
+                     "WHERE status='running'", (_now(),))
+        conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') "
+                     "AND created_at < strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime', ?)", (f"-{max_age_days} days",))
+        return [row[0] for row in conn.execute("SELECT id FROM jobs WHERE status='queued' ORDER BY id")]
+
+# --- Streaming Exports ---
+
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_TABLES = ("progress", "session_plans")
+# Progress is exported with names rather than keys, so files read well and re-import with bulk_import
+PROGRESS_EXPORT_COLUMNS = ("id", "date", "child_name", "discipline", "goal_area", "status", "notes",
+                           "media_path", "thumb_path", "preview_path", "media_id")
+
+def get_table_columns(table_name):
+    """Returns the exported column names of a table (schema order for session plans)."""
+    if table_name == "progress":
+        return list(PROGRESS_EXPORT_COLUMNS)
+    with _connection() as conn:
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+
+def iter_export_rows(table_name, chunk_size=EXPORT_CHUNK_SIZE, start_date=None, end_date=None, **filters):
+    """Streams a table in date order as lists of row tuples, `chunk_size` rows at a time.
+
+    Both tables accept a date range; progress also accepts child_id/discipline_id/goal_area_id filters.
+    Columns are in get_table_columns() order.
+    """
+    if table_name not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table: {table_name}")
+    if table_name != "progress":
+        filters = {} # Session plans are not per-child
+    where, params = _progress_filters(start_date=start_date, end_date=end_date, **filters)
+    source = f"{', '.join(PROGRESS_EXPORT_COLUMNS)} FROM progress_named" if table_name == "progress" else "* FROM session_plans"
+    with _connection() as conn:
+        cursor = conn.execute(f"SELECT {source} {where} ORDER BY date, id", params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+# --- Bulk Import ---
+
+IMPORT_BATCH_SIZE = 2000
+
+# Same semantics as the single-row functions. Import files name children, disciplines and goal
+# areas; the keys are looked up during the insert (bulk_import only passes names that exist).
+# Children upsert on their unique name. A row naming a parent login (checked by bulk_import) links
+# it as set_child_parent does; rows without one leave the child's current link alone.
+_IMPORT_UNLINK, _IMPORT_LINK = _parent_link_sql("(SELECT id FROM children WHERE child_name = ?)")
+IMPORT_STATEMENTS = {
+    "progress": [('''INSERT INTO progress (date, child_id, discipline_id, goal_area_id, status, notes, media_path)
+                    VALUES (?, (SELECT id FROM children WHERE child_name = ?), (SELECT id FROM disciplines WHERE name = ?),
+                            (SELECT id FROM goal_areas WHERE name = ?), ?, ?, ?)''',
+                  ("date", "child_name", "discipline", "goal_area", "status", "notes", "media_path"))],
+    "children": [('''INSERT INTO children (child_name, date_of_birth) VALUES (?, ?)
+                    ON CONFLICT (child_name) DO UPDATE SET date_of_birth=excluded.date_of_birth, archived=0''',
+                  ("child_name", "date_of_birth")),
+                 (f"{_IMPORT_UNLINK} AND ? IS NOT NULL", ("child_name", "parent_username", "parent_username")),
+                 (_IMPORT_LINK, ("child_name", "parent_username"))],
+    "session_plans": [('''INSERT INTO session_plans (date, lead_staff, support_staff, warm_up, learning_block, regulation_break, social_play, closing_routine, materials_needed, internal_notes)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                       ("date", "lead_staff", "support_staff", "warm_up", "learning_block", "regulation_break",
+                        "social_play", "closing_routine", "materials_needed", "internal_notes"))],
+}
+
+def bulk_insert(table_name, rows):
+    """Inserts a batch of rows (dicts keyed by column) in a single transaction with executemany."""
+    with _transaction() as conn:
+        for sql, columns in IMPORT_STATEMENTS[table_name]:
+            conn.executemany(sql, [tuple(row.get(column) for column in columns) for row in rows])
+    return len(rows)
+
+# Time every public function (see instrumentation.py); normalize_date runs per imported row and stays bare
+instrument_module(globals(), "db", exclude=("normalize_date",))
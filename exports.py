@@ -0,0 +1,89 @@
+# exports.py
+# Streaming CSV / gzip CSV / Parquet exports of the progress and session_plans tables.
+# Rows are pulled from SQLite in chunks and written straight to a file in EXPORT_DIR, so memory
+# stays flat regardless of table size. Nothing is generated until a user asks for an export.
+import csv
+import gzip
+import os
+import time
+from datetime import datetime
+from database import get_table_columns, iter_export_rows
+from instrumentation import instrument_module
+
+EXPORT_DIR = "exports"
+# Generated files are only needed long enough to be downloaded
+EXPORT_MAX_AGE_SECONDS = 24 * 60 * 60
+
+FORMATS = {
+    "csv": {"label": "CSV", "extension": "csv", "mime": "text/csv"},
+    "csv.gz": {"label": "CSV (gzip)", "extension": "csv.gz", "mime": "application/gzip"},
+    "parquet": {"label": "Parquet", "extension": "parquet", "mime": "application/vnd.apache.parquet"},
+}
+
+def parquet_available():
+    """Parquet export needs the optional pyarrow package."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _write_csv(f, columns, chunks):
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    rows = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        rows += len(chunk)
+    return rows
+
+def _write_parquet(path, columns, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Every column is exported as text, matching how the values are stored in SQLite
+    schema = pa.schema([(name, pa.string()) for name in columns])
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            data = [[None if row[i] is None else str(row[i]) for row in chunk] for i in range(len(columns))]
+            writer.write_table(pa.Table.from_arrays([pa.array(col, pa.string()) for col in data], schema=schema))
+            rows += len(chunk)
+    return rows
+
+def _prune_old_exports():
+    cutoff = time.time() - EXPORT_MAX_AGE_SECONDS
+    with os.scandir(EXPORT_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+
+def write_export(table_name, fmt="csv", **filters):
+    """Streams a filtered table export to disk and returns (path, row_count).
+
+    `filters` are passed to database.iter_export_rows (start_date, end_date, child, ...).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == "parquet" and not parquet_available():
+        raise RuntimeError("Parquet export requires the 'pyarrow' package.")
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    _prune_old_exports()
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    path = os.path.join(EXPORT_DIR, f"{table_name}_{stamp}.{FORMATS[fmt]['extension']}")
+    columns = get_table_columns(table_name)
+    chunks = iter_export_rows(table_name, **filters)
+
+    if fmt == "parquet":
+        rows = _write_parquet(path, columns, chunks)
+    elif fmt == "csv.gz":
+        with gzip.open(path, "wt", newline="", encoding="utf-8") as f:
+            rows = _write_csv(f, columns, chunks)
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            rows = _write_csv(f, columns, chunks)
+    return path, rows
+
+instrument_module(globals(), "export", names=("write_export",), path_results=("write_export",))
@@ -0,0 +1,144 @@
+# instrumentation.py
+# In-process timing of the hot paths: every public database.py function, media and export I/O,
+# and each page's show_page. Records call counts, durations, row counts and bytes per name in a
+# log-scale latency histogram, and logs calls slower than SLOW_CALL_MS. Admin Tools shows the
+# numbers. Disable with TILP_INSTRUMENTATION=0 (or at runtime from the Diagnostics tab); disabled
+# wrappers cost one flag check per call.
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Upper bounds (ms) of the histogram buckets; the last bucket catches everything slower
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+SLOW_CALL_MS = float(os.environ.get("TILP_SLOW_CALL_MS", "250"))
+SLOW_LOG_SIZE = 200
+
+logger = logging.getLogger("tilp.slow")
+
+class _State:
+    enabled = os.environ.get("TILP_INSTRUMENTATION", "1") != "0"
+
+_lock = threading.Lock()
+_stats = {}
+_slow_calls = deque(maxlen=SLOW_LOG_SIZE)
+
+def is_enabled():
+    return _State.enabled
+
+def set_enabled(enabled):
+    """Turns recording on or off for the whole process."""
+    _State.enabled = bool(enabled)
+
+def reset():
+    """Clears all recorded statistics and the slow call log."""
+    with _lock:
+        _stats.clear()
+        _slow_calls.clear()
+
+def _measure(result, returns_path=False):
+    """Returns (rows, bytes) for a result: DataFrames, (DataFrame, ...) tuples, lists and media records.
+
+    With `returns_path` the result (or its first element) is a file path and its size is recorded.
+    """
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if returns_path:
+        return None, (os.path.getsize(result) if result and os.path.isfile(result) else None)
+    if hasattr(result, "memory_usage") and hasattr(result, "columns"):
+        return len(result), int(result.memory_usage(index=False).sum())
+    if isinstance(result, list):
+        return len(result), None
+    if isinstance(result, dict) and "size_bytes" in result:
+        return None, result["size_bytes"]
+    return None, None
+
+def record(name, elapsed_ms, rows=None, nbytes=None):
+    """Adds one call's duration (and optionally rows/bytes) to the statistics for `name`."""
+    bucket = next(i for i, bound in enumerate(BUCKETS_MS) if elapsed_ms <= bound)
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "bytes": 0,
+                                   "histogram": [0] * len(BUCKETS_MS)}
+        stat["calls"] += 1
+        stat["total_ms"] += elapsed_ms
+        stat["max_ms"] = max(stat["max_ms"], elapsed_ms)
+        stat["rows"] += rows or 0
+        stat["bytes"] += nbytes or 0
+        stat["histogram"][bucket] += 1
+        if elapsed_ms >= SLOW_CALL_MS:
+            _slow_calls.append({"time": datetime.now().isoformat(timespec="seconds"), "name": name,
+                                "ms": round(elapsed_ms, 1), "rows": rows, "bytes": nbytes})
+    if elapsed_ms >= SLOW_CALL_MS:
+        logger.warning("slow call %s: %.1f ms (rows=%s, bytes=%s)", name, elapsed_ms, rows, nbytes)
+
+def timed(name, returns_path=False):
+    """Decorator recording every call of the function under `name` while instrumentation is enabled.
+
+    Set `returns_path` for functions that return the path of a file they wrote, to record its size.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _State.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                # Also records calls ending in an exception (including Streamlit's rerun)
+                record(name, (time.perf_counter() - started) * 1000, *_measure(result, returns_path))
+        wrapper.__wrapped_name__ = name
+        return wrapper
+    return decorator
+
+@contextmanager
+def span(name):
+    """Times a block of code (e.g. building a chart) under `name`."""
+    if not _State.enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - started) * 1000)
+
+def instrument_module(namespace, prefix, names=None, exclude=(), path_results=()):
+    """Wraps the public functions defined in a module namespace (pass globals()) with `timed`.
+
+    Call it at the end of the module so the views import the wrapped versions. Generator functions
+    are skipped (only their creation would be timed). The functions named in `path_results` return
+    file paths (see `timed`).
+    """
+    module_name = namespace["__name__"]
+    for name, value in list(namespace.items()):
+        if (names is not None and name not in names) or name in exclude or name.startswith("_"):
+            continue
+        if (inspect.isfunction(value) and value.__module__ == module_name
+                and not inspect.isgeneratorfunction(value) and not hasattr(value, "__wrapped_name__")):
+            namespace[name] = timed(f"{prefix}.{name}", returns_path=name in path_results)(value)
+
+def snapshot():
+    """Returns (per-name statistics with mean/approximate p95, slow call log), newest slow calls first."""
+    with _lock:
+        stats = {name: {**stat, "histogram": list(stat["histogram"])} for name, stat in _stats.items()}
+        slow = list(reversed(_slow_calls))
+    for stat in stats.values():
+        stat["mean_ms"] = stat["total_ms"] / stat["calls"]
+        # p95 as the upper bound of the bucket holding the 95th percentile call
+        threshold, seen = 0.95 * stat["calls"], 0
+        for bound, count in zip(BUCKETS_MS, stat["histogram"]):
+            seen += count
+            if seen >= threshold:
+                stat["p95_ms"] = min(bound, stat["max_ms"])
+                break
+    return stats, slow
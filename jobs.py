@@ -0,0 +1,100 @@
+# jobs.py
+# Background job queue for work that should not block a Streamlit script run (exports, media
+# derivatives, reports, media cleanup). Jobs are rows in the SQLite `jobs` table, so their status
+# and results outlive the page that started them: a user can navigate away and pick up the result
+# later. A small thread pool shared by every session of the server process runs them.
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from database import create_job, start_job, finish_job, get_job, list_jobs, recover_jobs
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.environ.get("TILP_JOB_WORKERS", "2"))
+ACTIVE_STATUSES = ("queued", "running")
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="jobs")
+_recovered = threading.Event()
+_recover_lock = threading.Lock()
+_handlers = {}
+
+def handler(kind):
+    """Registers the function that runs jobs of `kind`; it receives the job params as keyword arguments
+    and returns a JSON-serializable result."""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+def _run(job_id):
+    if not start_job(job_id):
+        return
+    job = get_job(job_id)
+    try:
+        result = _handlers[job["kind"]](**json.loads(job["params"] or "{}"))
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job_id, job["kind"])
+        finish_job(job_id, error=str(e) or type(e).__name__)
+    else:
+        finish_job(job_id, result=json.dumps(result, default=str))
+
+def recover():
+    """Resubmits jobs queued before a restart (and fails ones cut off mid-run). Runs once per process."""
+    with _recover_lock:
+        if _recovered.is_set():
+            return
+        for job_id in recover_jobs():
+            _executor.submit(_run, job_id)
+        _recovered.set()
+
+def submit(kind, params=None, owner=None):
+    """Queues a job and returns its id immediately. Dates in `params` are stored as ISO strings."""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    recover()
+    job_id = create_job(kind, json.dumps(params or {}, default=str), owner)
+    _executor.submit(_run, job_id)
+    return job_id
+
+def job_status(job_id):
+    """Returns the job dict with its result decoded, or None if it no longer exists."""
+    job = get_job(job_id)
+    if job and job["result"]:
+        job["result"] = json.loads(job["result"])
+    return job
+
+def latest_job(owner, kind, **params):
+    """Returns the owner's newest job of `kind` whose params include `params` (decoded), or None."""
+    for job in list_jobs(owner=owner, kind=kind):
+        job_params = json.loads(job["params"] or "{}")
+        if all(job_params.get(key) == value for key, value in params.items()):
+            if job["result"]:
+                job["result"] = json.loads(job["result"])
+            return job
+    return None
+
+# --- Job handlers (modules are imported when a job runs, keeping the login path light) ---
+
+@handler("export")
+def _export(table_name, fmt="csv", **filters):
+    from exports import write_export
+    path, rows = write_export(table_name, fmt, **filters)
+    return {"path": path, "rows": rows, "fmt": fmt}
+
+@handler("media_derivatives")
+def _media_derivatives(progress_id, media_path):
+    from media_pipeline import generate_derivatives
+    thumb, preview = generate_derivatives(progress_id, media_path)
+    return {"thumb_path": thumb, "preview_path": preview}
+
+@handler("reports")
+def _reports(child_ids, start_date, end_date, fmt="html"):
+    from reports import generate_caseload
+    return {**generate_caseload(child_ids, start_date, end_date, fmt), "fmt": fmt}
+
+@handler("media_lifecycle")
+def _media_lifecycle(**params):
+    from media_lifecycle import run_lifecycle
+    return run_lifecycle(**params)
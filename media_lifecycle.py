@@ -0,0 +1,158 @@
+# media_lifecycle.py
+# Keeps the media volume (the largest part of our storage and backups) in check. Runs as a
+# background job (see jobs.py) started from the admin Media Storage tab, in three steps:
+#
+#   1. Orphans: files under MEDIA_DIR that no progress entry uses (uploads whose entry failed to
+#      save, leftover .part files, derivatives of removed media) are deleted, together with
+#      media_files rows nothing links to. The directory is scanned entry by entry and reconciled
+#      against the database in SQL (database.find_unreferenced_media).
+#   2. Compression: originals older than COMPRESS_AFTER_DAYS are re-encoded once (see
+#      media_pipeline.recompress) and replaced when that saves at least MIN_COMPRESSION_SAVING.
+#   3. Archiving: when TILP_MEDIA_ARCHIVE_DIR points at cheaper storage, originals older than
+#      ARCHIVE_AFTER_DAYS move there. Thumbnails and previews stay, so the feed is unaffected.
+#
+# Files younger than ORPHAN_GRACE_HOURS are never collected: an upload is written before its
+# progress entry is saved.
+import logging
+import mimetypes
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from itertools import chain
+from database import delete_orphan_media_records, find_unreferenced_media, get_media_due, set_media_tier
+from media_store import MEDIA_DIR
+from media_pipeline import compressed_extension, recompress
+from instrumentation import instrument_module
+
+logger = logging.getLogger(__name__)
+
+ORPHAN_GRACE_HOURS = 24
+COMPRESS_AFTER_DAYS = int(os.environ.get("TILP_MEDIA_COMPRESS_DAYS", "180"))
+ARCHIVE_AFTER_DAYS = int(os.environ.get("TILP_MEDIA_ARCHIVE_DAYS", "730"))
+# Unset (the default) disables archiving
+ARCHIVE_DIR = os.environ.get("TILP_MEDIA_ARCHIVE_DIR") or None
+MIN_COMPRESSION_SAVING = 0.1
+# Re-encoding video is slow; each run handles at most this many files per step
+LIFECYCLE_BATCH_SIZE = 200
+
+def _scan(root, modified_before):
+    """Yields (path, size_bytes, mtime) for the files under `root` last modified before the cutoff."""
+    directories = [root] if os.path.isdir(root) else []
+    while directories:
+        with os.scandir(directories.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime < modified_before:
+                        yield entry.path, stat.st_size, stat.st_mtime
+
+def _cutoff(**delta):
+    return (datetime.now() - timedelta(**delta)).isoformat(timespec="seconds")
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def collect_orphans(dry_run=True, grace_hours=ORPHAN_GRACE_HOURS):
+    """Deletes media files and media_files rows no progress entry uses. `dry_run` only counts them."""
+    records = delete_orphan_media_records(_cutoff(hours=grace_hours), dry_run=dry_run)
+    roots = [MEDIA_DIR] + ([ARCHIVE_DIR] if ARCHIVE_DIR else [])
+    modified_before = time.time() - grace_hours * 3600
+    orphans = find_unreferenced_media(chain.from_iterable(_scan(root, modified_before) for root in roots))
+
+    removed, reclaimed, errors = 0, 0, []
+    for path, size_bytes, _ in orphans:
+        if not dry_run:
+            try:
+                _remove(path)
+            except OSError as e:
+                errors.append(f"{path}: {e}")
+                continue
+        removed += 1
+        reclaimed += size_bytes
+    return {"files": removed, "records": len(records), "bytes": reclaimed, "errors": errors}
+
+def compress_old_media(dry_run=True, older_than_days=COMPRESS_AFTER_DAYS, limit=LIFECYCLE_BATCH_SIZE):
+    """Re-encodes originals older than `older_than_days` in place. `dry_run` only counts the candidates.
+
+    A file whose re-encoded copy is not at least MIN_COMPRESSION_SAVING smaller is kept as it is
+    (and marked compressed, so it is not tried again).
+    """
+    due = [m for m in get_media_due(("original",), _cutoff(days=older_than_days), limit)
+           if compressed_extension(m["path"]) and os.path.exists(m["path"])]
+    if dry_run:
+        return {"files": len(due), "candidate_bytes": sum(m["size_bytes"] or 0 for m in due), "bytes": 0, "errors": []}
+
+    compressed, saved, errors = 0, 0, []
+    for media in due:
+        path = media["path"]
+        stem = os.path.splitext(path)[0]
+        target = stem + compressed_extension(path)
+        # The temporary copy keeps the real extension: ffmpeg picks the container from it
+        temp_path = f"{stem}.compressing{compressed_extension(path)}"
+        try:
+            if not recompress(path, temp_path):
+                _remove(temp_path)
+                continue
+            new_size = os.path.getsize(temp_path)
+            if new_size > (media["size_bytes"] or 0) * (1 - MIN_COMPRESSION_SAVING):
+                _remove(temp_path)
+                set_media_tier(media["id"], path, media["size_bytes"], media["mime_type"], "compressed")
+                continue
+            os.replace(temp_path, target)
+            set_media_tier(media["id"], target, new_size, mimetypes.guess_type(target)[0], "compressed")
+            if target != path:
+                _remove(path)
+        except Exception as e:
+            logger.exception("Could not recompress %s", path)
+            _remove(temp_path)
+            errors.append(f"{path}: {e}")
+            continue
+        compressed += 1
+        saved += (media["size_bytes"] or 0) - new_size
+    return {"files": compressed, "bytes": saved, "errors": errors}
+
+def archive_old_media(dry_run=True, older_than_days=ARCHIVE_AFTER_DAYS, archive_dir=ARCHIVE_DIR,
+                      limit=LIFECYCLE_BATCH_SIZE):
+    """Moves originals older than `older_than_days` to `archive_dir`. `dry_run` only counts them."""
+    if not archive_dir:
+        return {"files": 0, "bytes": 0, "errors": [], "disabled": True}
+    due = [m for m in get_media_due(("original", "compressed"), _cutoff(days=older_than_days), limit)
+           if os.path.exists(m["path"])]
+    if dry_run:
+        return {"files": len(due), "bytes": sum(m["size_bytes"] or 0 for m in due), "errors": []}
+
+    os.makedirs(archive_dir, exist_ok=True)
+    archived, moved, errors = 0, 0, []
+    for media in due:
+        path = media["path"]
+        target = os.path.join(archive_dir, os.path.basename(path))
+        # Copy, then switch the database over, then delete: a failure at any point loses nothing
+        try:
+            shutil.copy2(path, f"{target}.part")
+            os.replace(f"{target}.part", target)
+            set_media_tier(media["id"], target, media["size_bytes"], media["mime_type"], "archived")
+            _remove(path)
+        except Exception as e:
+            logger.exception("Could not archive %s", path)
+            _remove(f"{target}.part")
+            errors.append(f"{path}: {e}")
+            continue
+        archived += 1
+        moved += media["size_bytes"] or 0
+    return {"files": archived, "bytes": moved, "errors": errors}
+
+def run_lifecycle(dry_run=True, compress_after_days=COMPRESS_AFTER_DAYS, archive_after_days=ARCHIVE_AFTER_DAYS):
+    """Runs the three steps and returns their results plus the bytes freed on the media volume."""
+    orphans = collect_orphans(dry_run)
+    compressed = compress_old_media(dry_run, compress_after_days)
+    archived = archive_old_media(dry_run, archive_after_days)
+    return {"dry_run": dry_run, "orphans": orphans, "compressed": compressed, "archived": archived,
+            "reclaimed_bytes": orphans["bytes"] + compressed["bytes"] + archived["bytes"]}
+
+instrument_module(globals(), "media", names=("collect_orphans", "compress_old_media", "archive_old_media"))
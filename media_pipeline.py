@@ -0,0 +1,131 @@
+# media_pipeline.py
+# Generates small thumbnails and web-friendly previews for tracker uploads (run as background jobs,
+# see jobs.py), so the dashboard feed can show a few KB per entry instead of the full-size original.
+#
+# Images are handled with Pillow; videos need the ffmpeg binary on PATH. When either is missing the
+# corresponding derivative is skipped and the dashboard falls back to the original file.
+import logging
+import os
+import shutil
+import subprocess
+from database import set_media_derivatives
+from media_store import MEDIA_DIR
+from instrumentation import instrument_module
+
+logger = logging.getLogger(__name__)
+
+THUMB_DIR = os.path.join(MEDIA_DIR, "thumbs")
+PREVIEW_DIR = os.path.join(MEDIA_DIR, "previews")
+
+THUMB_SIZE = 320         # longest edge, px
+PREVIEW_SIZE = 1280      # longest edge, px
+THUMB_QUALITY = 70
+PREVIEW_QUALITY = 82
+VIDEO_PREVIEW_CRF = 28   # x264 quality; higher is smaller
+# Older originals are re-encoded once (see media_lifecycle.py): still full quality for viewing and
+# reports, at a fraction of a phone camera's file size
+COMPRESSED_IMAGE_SIZE = 2560
+COMPRESSED_IMAGE_QUALITY = 82
+COMPRESSED_VIDEO_SIZE = 1920
+COMPRESSED_VIDEO_CRF = 26
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+VIDEO_EXTENSIONS = (".mp4", ".mov")
+
+def _derivative_path(directory, media_path, extension):
+    stem = os.path.splitext(os.path.basename(media_path))[0]
+    return os.path.join(directory, f"{stem}{extension}")
+
+def _resize_image(source, target, size, quality):
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img) # Phone photos are often stored rotated
+        img.thumbnail((size, size))
+        img.convert("RGB").save(target, "JPEG", quality=quality, optimize=True, progressive=True)
+
+def _ffmpeg(*args):
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", *args], check=True, timeout=600)
+
+def _process_image(media_path, thumb, preview):
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        logger.warning("Pillow is not installed; skipping image derivatives for %s", media_path)
+        return "", ""
+    _resize_image(media_path, thumb, THUMB_SIZE, THUMB_QUALITY)
+    _resize_image(media_path, preview, PREVIEW_SIZE, PREVIEW_QUALITY)
+    return thumb, preview
+
+def _process_video(media_path, thumb, preview):
+    if shutil.which("ffmpeg") is None:
+        logger.warning("ffmpeg is not available; skipping video derivatives for %s", media_path)
+        return "", ""
+    # Poster frame from one second in (or the first frame for very short clips)
+    _ffmpeg("-ss", "1", "-i", media_path, "-frames:v", "1",
+            "-vf", f"scale='min({THUMB_SIZE},iw)':-2", thumb)
+    if not os.path.exists(thumb):
+        _ffmpeg("-i", media_path, "-frames:v", "1", "-vf", f"scale='min({THUMB_SIZE},iw)':-2", thumb)
+    # H.264/AAC with faststart plays progressively in every mobile browser
+    _ffmpeg("-i", media_path, "-vf", f"scale='min({PREVIEW_SIZE},iw)':-2",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", str(VIDEO_PREVIEW_CRF),
+            "-c:a", "aac", "-b:a", "96k", "-movflags", "+faststart", preview)
+    return thumb, preview
+
+def compressed_extension(media_path):
+    """Extension of a re-encoded original: JPEG for images, H.264 MP4 for videos (None if unsupported)."""
+    extension = os.path.splitext(media_path)[1].lower()
+    if extension in IMAGE_EXTENSIONS:
+        return ".jpg"
+    if extension in VIDEO_EXTENSIONS:
+        return ".mp4"
+    return None
+
+def recompress(media_path, target):
+    """Re-encodes an original into `target` (see compressed_extension). Returns False when the
+    needed tool (Pillow or ffmpeg) is missing or the type is unsupported."""
+    extension = compressed_extension(media_path)
+    if extension == ".jpg":
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            logger.warning("Pillow is not installed; cannot recompress %s", media_path)
+            return False
+        _resize_image(media_path, target, COMPRESSED_IMAGE_SIZE, COMPRESSED_IMAGE_QUALITY)
+        return True
+    if extension == ".mp4":
+        if shutil.which("ffmpeg") is None:
+            logger.warning("ffmpeg is not available; cannot recompress %s", media_path)
+            return False
+        _ffmpeg("-i", media_path, "-vf", f"scale='min({COMPRESSED_VIDEO_SIZE},iw)':-2",
+                "-c:v", "libx264", "-preset", "medium", "-crf", str(COMPRESSED_VIDEO_CRF),
+                "-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart", target)
+        return True
+    return False
+
+def generate_derivatives(progress_id, media_path):
+    """Creates the thumbnail and preview for one upload and records them on the progress row."""
+    os.makedirs(THUMB_DIR, exist_ok=True)
+    os.makedirs(PREVIEW_DIR, exist_ok=True)
+    extension = os.path.splitext(media_path)[1].lower()
+    if extension not in IMAGE_EXTENSIONS + VIDEO_EXTENSIONS:
+        return "", ""
+    is_video = extension in VIDEO_EXTENSIONS
+    thumb = _derivative_path(THUMB_DIR, media_path, ".jpg")
+    preview = _derivative_path(PREVIEW_DIR, media_path, ".mp4" if is_video else ".jpg")
+
+    # Media files are content-addressed, so a re-uploaded file already has its derivatives
+    if not (os.path.exists(thumb) and os.path.exists(preview)):
+        try:
+            if is_video:
+                thumb, preview = _process_video(media_path, thumb, preview)
+            else:
+                thumb, preview = _process_image(media_path, thumb, preview)
+        except Exception:
+            logger.exception("Could not generate derivatives for %s", media_path)
+            return "", ""
+    set_media_derivatives(progress_id, thumb, preview)
+    return thumb, preview
+
+instrument_module(globals(), "media", names=("generate_derivatives", "recompress"),
+                  path_results=("generate_derivatives",))
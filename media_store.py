@@ -0,0 +1,76 @@
+# media_store.py
+# Content-addressed storage for tracker uploads. Files are written in chunks while being hashed,
+# named by their SHA-256 so identical uploads (e.g. one group video attached for several children)
+# are stored once, and their size/hash/mime metadata is recorded in the media_files table.
+import hashlib
+import mimetypes
+import os
+import tempfile
+from database import register_media, get_media_by_hash
+from instrumentation import instrument_module
+
+MEDIA_DIR = "media"
+CHUNK_SIZE = 1024 * 1024 # 1 MB
+# Override with the TILP_MAX_UPLOAD_MB environment variable
+MAX_UPLOAD_BYTES = int(os.environ.get("TILP_MAX_UPLOAD_MB", "200")) * 1024 * 1024
+
+ALLOWED_EXTENSIONS = (".jpg", ".jpeg", ".png", ".mp4", ".mov")
+
+class MediaTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+def _extension(file_name):
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"Unsupported media type: {extension or file_name}")
+    return extension
+
+def save_upload(uploaded_file, file_name=None, max_bytes=MAX_UPLOAD_BYTES):
+    """Stores an upload (any binary file-like object) and returns its media_files record as a dict.
+
+    The data is streamed to a temporary file in MEDIA_DIR and hashed as it is written; if a file
+    with the same content already exists the temporary copy is discarded and the existing record
+    is returned. Raises MediaTooLargeError when the upload exceeds `max_bytes`.
+    """
+    file_name = file_name or getattr(uploaded_file, "name", "")
+    extension = _extension(file_name)
+    declared_size = getattr(uploaded_file, "size", None)
+    if declared_size is not None and declared_size > max_bytes:
+        raise MediaTooLargeError(f"{file_name} is {declared_size / 1e6:.1f} MB; the limit is {max_bytes / 1e6:.0f} MB.")
+
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=MEDIA_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if hasattr(uploaded_file, "seek"):
+                uploaded_file.seek(0)
+            while True:
+                chunk = uploaded_file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise MediaTooLargeError(f"{file_name} exceeds the {max_bytes / 1e6:.0f} MB upload limit.")
+                digest.update(chunk)
+                f.write(chunk)
+
+        sha256 = digest.hexdigest()
+        existing = get_media_by_hash(sha256)
+        if existing and os.path.exists(existing["path"]):
+            os.remove(temp_path)
+            return existing
+
+        path = os.path.join(MEDIA_DIR, f"{sha256}{extension}")
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    mime_type = getattr(uploaded_file, "type", None) or mimetypes.guess_type(path)[0]
+    media_id = register_media(sha256, path, size, mime_type)
+    return {"id": media_id, "sha256": sha256, "path": path, "size_bytes": size, "mime_type": mime_type}
+
+instrument_module(globals(), "media", names=("save_upload",))
@@ -0,0 +1,45 @@
+# passwords.py
+# Salted PBKDF2-HMAC-SHA256 password hashing (standard library only).
+# Stored format: pbkdf2_sha256$<iterations>$<salt b64>$<hash b64>
+import base64
+import hashlib
+import hmac
+import os
+
+ALGORITHM = "pbkdf2_sha256"
+# Work factor. Raise it as hardware gets faster; older hashes are upgraded on the next login.
+HASH_ITERATIONS = int(os.environ.get("TILP_HASH_ITERATIONS", "600000"))
+SALT_BYTES = 16
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+def is_hashed(stored):
+    """True if a stored password value is already in the hashed format."""
+    return bool(stored) and stored.startswith(f"{ALGORITHM}$")
+
+def hash_password(password, iterations=None):
+    """Returns the storable hash of a plaintext password."""
+    iterations = iterations or HASH_ITERATIONS
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(digest)}"
+
+def verify_password(password, stored):
+    """Checks a password against a stored value. Returns (matches, needs_rehash).
+
+    Legacy plaintext values are still accepted so existing accounts keep working; they (and hashes
+    with an outdated work factor) are reported as needing a rehash.
+    """
+    if not stored or password is None:
+        return False, False
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8")), True
+    try:
+        _, iterations, salt, expected = stored.split("$")
+        iterations = int(iterations)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), base64.b64decode(salt), iterations)
+    except (ValueError, TypeError):
+        return False, False
+    matches = hmac.compare_digest(_b64(digest), expected)
+    return matches, matches and iterations != HASH_ITERATIONS
@@ -0,0 +1,205 @@
+# reports.py
+# Per-child progress reports for parent meetings: headline metrics, a per-goal trend chart (inline
+# SVG, no plotting libraries), the notes and media thumbnails for a date range, as a standalone HTML
+# file (PDF too when the optional weasyprint package is installed).
+#
+# Reports are cached in REPORT_DIR under a name that includes the child's progress fingerprint, so
+# a report is only rendered again once that child's rows change. A caseload is rendered in
+# parallel with a process pool; only the children whose cached report is stale are sent to it.
+import base64
+import glob
+import html
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import database
+from database import get_progress_children, get_progress_fingerprint, get_progress_snapshot, query_progress
+from trends import build_trend
+
+REPORT_DIR = "reports"
+REPORT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+MAX_REPORT_NOTES = 500
+MAX_REPORT_MEDIA = 12
+# Caseload zips are only needed long enough to be downloaded (the per-child reports stay cached)
+CASELOAD_MAX_AGE_SECONDS = 24 * 60 * 60
+FORMATS = {"html": "text/html", "pdf": "application/pdf"}
+GOAL_COLORS = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#17becf")
+
+def pdf_available():
+    """PDF output needs the optional weasyprint package."""
+    try:
+        import weasyprint  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_") or "child"
+
+def report_path(child_id, start_date, end_date, fmt, fingerprint):
+    """Cache location of one report; the fingerprint makes stale reports miss the cache."""
+    return os.path.join(REPORT_DIR, f"child{child_id}_{start_date}_{end_date}_{fingerprint}.{fmt}")
+
+# --- RENDERING ---
+
+def _trend_svg(trend, width=720, height=240, pad=36):
+    """Draws the per-goal mean status (1-3) over time as an inline SVG line chart."""
+    if trend.empty:
+        return "<p>No sessions in this period.</p>"
+    start, end = trend["date"].min(), trend["date"].max()
+    span = max((end - start).total_seconds(), 1)
+
+    def x(value):
+        return pad + (value - start).total_seconds() / span * (width - 2 * pad)
+
+    def y(score):
+        return height - pad - (score - 1) / 2 * (height - 2 * pad)
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-size="11">']
+    for score, label in ((1, "Regression"), (2, "Stable"), (3, "Progress")):
+        parts.append(f'<line x1="{pad}" x2="{width - pad}" y1="{y(score):.1f}" y2="{y(score):.1f}" stroke="#ddd"/>'
+                     f'<text x="2" y="{y(score) + 4:.1f}">{label}</text>')
+    legend_x = pad
+    for i, (goal, rows) in enumerate(trend.groupby("goal_area", observed=True)):
+        color = GOAL_COLORS[i % len(GOAL_COLORS)]
+        points = " ".join(f"{x(d):.1f},{y(v):.1f}" for d, v in zip(rows["date"], rows["mean_status"]))
+        parts.append(f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="2"/>')
+        parts.extend(f'<circle cx="{x(d):.1f}" cy="{y(v):.1f}" r="2.5" fill="{color}"/>'
+                     for d, v in zip(rows["date"], rows["mean_status"]))
+        parts.append(f'<text x="{legend_x}" y="{height - 8}" fill="{color}">■ {html.escape(str(goal))}</text>')
+        legend_x += 12 + 7 * len(str(goal))
+    parts.append(f'<text x="{pad}" y="14">{start:%Y-%m-%d}</text>'
+                 f'<text x="{width - pad}" y="14" text-anchor="end">{end:%Y-%m-%d}</text></svg>')
+    return "".join(parts)
+
+def _thumbnail(path):
+    with open(path, "rb") as f:
+        return f'<img src="data:image/jpeg;base64,{base64.b64encode(f.read()).decode("ascii")}" alt="">'
+
+def render_report(child_id, child_name, start_date, end_date):
+    """Builds the HTML report for one child and date range."""
+    filters = {"child_id": child_id, "start_date": start_date, "end_date": end_date}
+    snapshot = get_progress_snapshot(**filters)
+    trend, resolution = build_trend(snapshot["daily"], "auto")
+    notes = query_progress("date, discipline, goal_area, status, notes, thumb_path", limit=MAX_REPORT_NOTES, **filters)
+
+    total = snapshot["total"]
+    rate = round(snapshot["progress_count"] / total * 100) if total else 0
+    latest = snapshot["latest"][2] if snapshot["latest"] else "—"
+
+    goal_rows = []
+    daily = snapshot["daily"]
+    for goal, rows in daily.groupby("goal_area", observed=True):
+        sessions = int(rows["sessions"].sum())
+        mean = (rows["regression"].sum() + 2 * rows["stable"].sum() + 3 * rows["progress"].sum()) / sessions
+        goal_rows.append(f"<tr><td>{html.escape(str(goal))}</td><td>{sessions}</td><td>{mean:.2f}</td>"
+                         f"<td>{round(rows['progress'].sum() / sessions * 100)}%</td></tr>")
+
+    note_rows = "".join(
+        f"<tr><td>{row.date:%Y-%m-%d}</td><td>{html.escape(str(row.discipline))}</td>"
+        f"<td>{html.escape(str(row.goal_area))}</td><td>{html.escape(str(row.status))}</td>"
+        f"<td>{html.escape(row.notes or '')}</td></tr>"
+        for row in notes.itertuples())
+    thumbs = [p for p in notes["thumb_path"].dropna() if p and os.path.exists(p)][:MAX_REPORT_MEDIA]
+
+    title = f"Progress Report: {html.escape(child_name)}"
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: Helvetica, Arial, sans-serif; margin: 2em; color: #222; }}
+table {{ border-collapse: collapse; width: 100%; margin-bottom: 1.5em; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: left; vertical-align: top; font-size: 13px; }}
+.metrics td {{ font-size: 18px; }}
+.media img {{ height: 120px; margin: 4px; border-radius: 4px; }}
+</style></head><body>
+<h1>🧩 {title}</h1>
+<p>{start_date} to {end_date} · generated {datetime.now():%Y-%m-%d %H:%M}</p>
+<table class="metrics"><tr><th>Sessions Logged</th><th>Positive Progress Rate</th><th>Latest Status</th></tr>
+<tr><td>{total}</td><td>{rate}%</td><td>{html.escape(str(latest))}</td></tr></table>
+<h2>Goal Achievement Trend</h2>
+{_trend_svg(trend)}
+<table><tr><th>Goal Area</th><th>Sessions</th><th>Average Status (1-3)</th><th>Progress Rate</th></tr>{''.join(goal_rows)}</table>
+<h2>Session Notes</h2>
+<table><tr><th>Date</th><th>Discipline</th><th>Goal</th><th>Status</th><th>Notes</th></tr>{note_rows}</table>
+{'<h2>Media</h2><div class="media">' + ''.join(_thumbnail(p) for p in thumbs) + '</div>' if thumbs else ''}
+</body></html>"""
+
+def write_report(child_id, child_name, start_date, end_date, fmt="html", fingerprint=None):
+    """Returns the path of the child's report, rendering it only if no report for the same data exists."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown report format: {fmt}")
+    if fmt == "pdf" and not pdf_available():
+        raise RuntimeError("PDF reports require the 'weasyprint' package.")
+    fingerprint = fingerprint or get_progress_fingerprint(child_id=child_id, start_date=start_date, end_date=end_date)
+    path = report_path(child_id, start_date, end_date, fmt, fingerprint)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    document = render_report(child_id, child_name, start_date, end_date)
+    temp_path = f"{path}.part"
+    if fmt == "pdf":
+        import weasyprint
+        weasyprint.HTML(string=document).write_pdf(temp_path)
+    else:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(document)
+    os.replace(temp_path, path)
+    # Older versions of the same report are stale now
+    for old_path in glob.glob(report_path(child_id, start_date, end_date, fmt, "*")):
+        if old_path != path:
+            os.remove(old_path)
+    return path
+
+# --- CASELOAD ---
+
+def _init_worker(db_name, cwd):
+    os.chdir(cwd)
+    database.DB_NAME = db_name
+
+def _prune_old_caseloads():
+    cutoff = time.time() - CASELOAD_MAX_AGE_SECONDS
+    for path in glob.glob(os.path.join(REPORT_DIR, "caseload_*.zip")):
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+def generate_caseload(child_ids, start_date, end_date, fmt="html", max_workers=REPORT_WORKERS):
+    """Writes reports for many children in parallel and bundles them into one zip.
+
+    Returns {"zip": path, "reports": [{"child", "path", "cached"}]} with the child names. Children
+    whose data has not changed since their last report reuse it without touching the process pool.
+    """
+    start_date, end_date = str(start_date), str(end_date)
+    names = get_progress_children()
+    pending, reports = {}, []
+    for child_id in child_ids:
+        name = names.get(child_id, str(child_id))
+        fingerprint = get_progress_fingerprint(child_id=child_id, start_date=start_date, end_date=end_date)
+        path = report_path(child_id, start_date, end_date, fmt, fingerprint)
+        if os.path.exists(path):
+            reports.append({"child": name, "path": path, "cached": True})
+        else:
+            pending[name] = (child_id, fingerprint)
+
+    if pending:
+        # Spawned workers: the server process runs threads (jobs, password hashing) that must not be forked
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(pending)),
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(database.DB_NAME, os.getcwd())) as pool:
+            futures = {name: pool.submit(write_report, child_id, name, start_date, end_date, fmt, fingerprint)
+                       for name, (child_id, fingerprint) in pending.items()}
+            reports.extend({"child": child, "path": future.result(), "cached": False} for child, future in futures.items())
+
+    reports.sort(key=lambda r: r["child"])
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    zip_path = os.path.join(REPORT_DIR, f"caseload_{start_date}_{end_date}_{stamp}.zip")
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    _prune_old_caseloads()
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for report in reports:
+            bundle.write(report["path"], f"{_slug(report['child'])}.{fmt}")
+    return {"zip": zip_path, "reports": reports}
@@ -0,0 +1,85 @@
+# trends.py
+# Goal-achievement trend engine. Works on the per-day aggregates from
+# database.get_daily_goal_status() (already grouped in SQL), buckets them per goal into
+# day/week/month periods with vectorized pandas, and caps the number of points per series so
+# the Plotly figure stays small no matter how many progress rows exist.
+import pandas as pd
+from instrumentation import instrument_module
+
+# Pandas period aliases, from finest to coarsest
+RESOLUTIONS = {"D": "Daily", "W": "Weekly", "M": "Monthly", "Q": "Quarterly"}
+MAX_POINTS_PER_SERIES = 120
+ROLLING_WINDOW = 4 # periods
+TREND_COLUMNS = ["date", "goal_area", "sessions", "mean_status", "rolling_mean"]
+DAILY_COLUMNS = ["date", "goal_area", "sessions", "regression", "stable", "progress", "mean_status"]
+
+def choose_resolution(start, end):
+    """Picks a bucket size for a date span: daily up to ~3 months, weekly up to 2 years, else monthly."""
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days
+    if days <= 92:
+        return "D"
+    if days <= 730:
+        return "W"
+    return "M"
+
+def _bucket(daily, resolution):
+    periods = daily["date"].dt.to_period(resolution)
+    grouped = daily.assign(period=periods).groupby(["goal_area", "period"], sort=True, observed=True)
+    trend = grouped[["sessions", "regression", "stable", "progress"]].sum().reset_index()
+    trend["mean_status"] = (trend["regression"] + 2 * trend["stable"] + 3 * trend["progress"]) / trend["sessions"]
+    trend["date"] = trend["period"].dt.start_time
+    return trend
+
+def build_trend(daily, resolution="auto", max_points=MAX_POINTS_PER_SERIES, rolling_window=ROLLING_WINDOW):
+    """Aggregates daily goal status into a plot-ready trend.
+
+    `daily` has columns date, goal_area, sessions, regression, stable, progress. With
+    resolution="auto" the bucket size follows the date span and is coarsened further until no goal
+    has more than `max_points` points. Returns (trend DataFrame, resolution used); the frame has
+    date, goal_area, sessions, mean_status (1-3, weighted by sessions) and rolling_mean.
+    """
+    if daily.empty:
+        return pd.DataFrame(columns=TREND_COLUMNS), "D"
+
+    daily = daily.assign(date=pd.to_datetime(daily["date"]))
+    order = list(RESOLUTIONS)
+    if resolution == "auto":
+        resolution = choose_resolution(daily["date"].min(), daily["date"].max())
+        while True:
+            trend = _bucket(daily, resolution)
+            longest = trend.groupby("goal_area", observed=True).size().max()
+            if longest <= max_points or resolution == order[-1]:
+                break
+            resolution = order[order.index(resolution) + 1]
+    else:
+        trend = _bucket(daily, resolution)
+
+    # Session-weighted rolling mean per goal, smoothing sparse days
+    trend["weighted"] = trend["mean_status"] * trend["sessions"]
+    rolling = trend.groupby("goal_area", observed=True)[["weighted", "sessions"]].rolling(rolling_window, min_periods=1).sum()
+    rolling = rolling.reset_index(level=0, drop=True)
+    trend["rolling_mean"] = rolling["weighted"] / rolling["sessions"]
+    return trend[TREND_COLUMNS], resolution
+
+def fold_new_rows(daily, rows):
+    """Adds newly inserted progress rows (date, goal_area, status) to a daily goal status frame.
+
+    Returns a new frame in the get_daily_goal_status() shape, so the trend can be rebuilt without
+    re-reading the rows already counted.
+    """
+    if rows.empty:
+        return daily
+    counts = rows.assign(
+        sessions=1,
+        regression=(rows["status"] == "Regression").astype(int),
+        stable=(rows["status"] == "Stable").astype(int),
+        progress=(rows["status"] == "Progress").astype(int),
+    )[DAILY_COLUMNS[:-1]]
+    merged = pd.concat([daily[DAILY_COLUMNS[:-1]], counts], ignore_index=True)
+    merged = merged.groupby(["date", "goal_area"], as_index=False, sort=True, observed=True, dropna=False).sum()
+    merged["mean_status"] = (merged["regression"] + 2 * merged["stable"] + 3 * merged["progress"]) / merged["sessions"]
+    # Concatenating categoricals with different categories falls back to object; restore the compact dtype
+    merged["goal_area"] = merged["goal_area"].astype("category")
+    return merged
+
+instrument_module(globals(), "trends", names=("build_trend", "fold_new_rows"))
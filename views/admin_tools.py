@@ -1,52 +1,120 @@
 # views/admin_tools.py (NEW FILE)
 import streamlit as st
-# The import must be relative, assuming database.py is now also in the 'views' folder
-from database import get_list_data, upsert_user, delete_user, upsert_child, delete_child, upsert_list_item, delete_list_item
+from instrumentation import timed
+from database import (get_data_versions, get_user_record, get_child_record, search_users, search_children,
+                      upsert_user, delete_user, upsert_child, set_child_parent, delete_child,
+                      upsert_list_item, rename_list_item, delete_list_item, DIRECTORY_PAGE_SIZE)
+from views.reference_data import get_reference_table, get_reference_options
+from bulk_import import import_file, IMPORT_TABLES
+from views.media_panel import show_media_panel
+from views.pager import page_offset, show_pager
+import instrumentation
 import pandas as pd
+import sqlite3
 from datetime import date
 
+ROLES = ["admin", "OT", "SLP", "BC", "ECE", "Assistant", "parent"]
+# Link pickers list this many matches; the search box above them narrows the rest down
+DIRECTORY_OPTION_LIMIT = 50
+
+# Directory pages are cached per search, keyed by the users and children data versions
+@st.cache_data(max_entries=32, show_spinner=False)
+def _search_users(prefix, role, unlinked, limit, offset, version):
+    return search_users(prefix, role, unlinked, limit, offset)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _search_children(prefix, unlinked, limit, offset, version):
+    return search_children(prefix, unlinked, limit, offset)
+
+def _show_list_editor(table_name, label, versions):
+    """Add, rename and delete controls for one custom list; entries are addressed by id."""
+    st.subheader(f"{label}s")
+    st.dataframe(get_reference_table(table_name, versions).drop(columns=["id"]), width="stretch")
+    items = get_reference_options(table_name, versions)
+
+    new_name = st.text_input(f"New {label} Name", key=f"{table_name}_new")
+    if st.button(f"➕ Add {label}", key=f"{table_name}_add") and new_name:
+        upsert_list_item(table_name, new_name)
+        st.success(f"{label} '{new_name}' added.")
+        st.rerun()
+
+    item_id = st.selectbox(f"Existing {label}", list(items), format_func=items.get, key=f"{table_name}_item")
+    rename_to = st.text_input("Rename To", key=f"{table_name}_rename_to",
+                              help="Existing progress entries show the new name immediately.")
+    col1, col2 = st.columns(2)
+    if col1.button(f"✏️ Rename {label}", key=f"{table_name}_rename") and item_id and rename_to:
+        try:
+            rename_list_item(table_name, item_id, rename_to)
+        except sqlite3.IntegrityError:
+            st.error(f"'{rename_to}' is already in the list.")
+        else:
+            st.success(f"{label} '{items[item_id]}' renamed to '{rename_to}'.")
+            st.rerun()
+    if col2.button(f"🗑️ Delete {label}", key=f"{table_name}_delete") and item_id:
+        # Items used by progress entries are archived: hidden from the lists, history kept
+        delete_list_item(table_name, item_id)
+        st.warning(f"{label} '{items[item_id]}' deleted.")
+        st.rerun()
+
+@timed("page.admin_tools")
 def show_page():
     # Only Admin should see this page, checked in app.py
     st.title("🔑 Admin Management Tools")
     st.info("Manage User Accounts, Child Profiles, and Custom List Options.")
 
-    tab1, tab2, tab3 = st.tabs(["👤 User Accounts", "👨‍👩‍👧‍👦 Child Profiles", "📝 Custom Lists"])
+    # Reference tables come from the shared cache; any write bumps their version and refreshes them
+    versions = get_data_versions()
+    # Directory pages list users with their child's name and children with their parent's login
+    directory_version = (versions.get("users", 0), versions.get("children", 0))
+
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["👤 User Accounts", "👨‍👩‍👧‍👦 Child Profiles", "📝 Custom Lists",
+                                                   "📥 Bulk Import", "📈 Diagnostics", "🗄️ Media Storage"])
 
     # --- TAB 1: USER ACCOUNTS (Request 2) ---
     with tab1:
         st.header("Staff and Parent Logins")
-        df_users = get_list_data("users")
-        st.dataframe(df_users, use_container_width=True)
+        col1, col2 = st.columns([3, 1])
+        user_query = col1.text_input("Search Users", placeholder="Username starts with...", key="users_query")
+        role_filter = col2.selectbox("Role Filter", [None, *ROLES], format_func=lambda r: r or "All Roles", key="users_role")
+        offset = page_offset("users_page", (user_query, role_filter), DIRECTORY_PAGE_SIZE)
+        df_users, total = _search_users(user_query, role_filter, False, DIRECTORY_PAGE_SIZE, offset, directory_version)
+        st.dataframe(df_users.drop(columns=["child_id"]), width="stretch", hide_index=True)
+        show_pager("users_page", total, DIRECTORY_PAGE_SIZE)
+
+        # Choosing an account outside the form lets the fields below show its current values
+        selected_user = st.selectbox("User Account", [None, *df_users["username"].tolist()],
+                                     format_func=lambda u: u or "➕ New User")
+        record = get_user_record(selected_user) if selected_user else None
+        child_query = st.text_input("Find Child to Link (for Parents)", placeholder="Child name starts with...",
+                                    key="users_child_query")
 
         with st.form("user_form"):
             st.subheader("Add / Edit / Delete User")
             col1, col2 = st.columns(2)
-            username = col1.text_input("Username (must be unique)", help="Used as the Login ID")
+            username = col1.text_input("Username (must be unique)", value=selected_user or "", help="Used as the Login ID",
+                                       key=f"user_name_{selected_user}")
             password = col2.text_input("Password (Leave blank to keep existing password for edit)", type="password")
             
             col3, col4 = st.columns(2)
-            role = col3.selectbox("Role", ["admin", "OT", "SLP", "BC", "ECE", "Assistant", "parent"])
+            role = col3.selectbox("Role", ROLES, index=ROLES.index(record["role"]) if record and record["role"] in ROLES else 0,
+                                  key=f"user_role_{selected_user}")
             
-            child_link = "All"
+            child_id = None
             
             # Parent Link logic
             if role == "parent":
-                children_df = get_list_data("children")
-                # Filter children not currently assigned to a parent or already assigned to this username
-                assigned_children = children_df[
-                    (children_df["parent_username"] == "None") | 
-                    (children_df["parent_username"] == username)
-                ]["child_name"].tolist()
-                
-                # Add the child they are already linked to, if any
-                current_link = df_users[df_users['username'] == username]['child_link'].iloc[0] if username in df_users['username'].values and df_users[df_users['username'] == username]['child_link'].iloc[0] != 'All' else 'None'
-                
-                available_children = ["None"] + sorted(list(set(assigned_children)))
-
-                # If the user is editing an existing parent, ensure their current child is selected by default
-                default_index = available_children.index(current_link) if current_link in available_children else 0
-                
-                child_link = col4.selectbox("Link to Child (for Parents)", available_children, index=default_index)
+                # Children not currently assigned to a parent, plus the child already linked to this login
+                df_available, matches = _search_children(child_query, True, DIRECTORY_OPTION_LIMIT, 0, directory_version)
+                child_names = dict(zip(df_available["id"].tolist(), df_available["child_name"].tolist()))
+                current_link = record["child_id"] if record else None
+                if current_link is not None:
+                    child_names.setdefault(current_link, record["child_name"])
+                options = [None, *child_names]
+
+                child_id = col4.selectbox("Link to Child (for Parents)", options, index=options.index(current_link),
+                                          format_func=lambda c: child_names.get(c, "None"), key=f"user_child_{selected_user}")
+                if matches > DIRECTORY_OPTION_LIMIT:
+                    col4.caption(f"Showing {DIRECTORY_OPTION_LIMIT} of {matches} unlinked children; search above to narrow.")
             else:
                 col4.write("Child Link: All (Staff Role)")
             
@@ -54,18 +122,10 @@ def show_page():
 
             if col5.form_submit_button("💾 Save User Account"):
                 if username:
-                    # If editing, we try to grab the old user record to keep the password if not provided
-                    old_user = df_users[df_users['username'] == username]
-                    current_password = old_user['password'].iloc[0] if not old_user.empty else None
-                    
-                    final_password = password if password else current_password
-                    final_child_link = child_link if role == "parent" and child_link != "None" else "All"
-                    
-                    upsert_user(username, final_password, role, final_child_link)
-                    
-                    # Update child's parent_username in children table if linked
-                    if final_child_link != "All":
-                        upsert_child(final_child_link, username)
+                    # A blank password keeps the stored hash (upsert_user only updates it when provided).
+                    # The link lives only on the user row, so the child profile needs no update.
+                    final_password = password if password else None
+                    upsert_user(username, final_password, role, child_id if role == "parent" else None)
 
                     st.success(f"User '{username}' ({role}) saved successfully.")
                     st.rerun()
@@ -74,11 +134,6 @@ def show_page():
             
             if col6.form_submit_button("🗑️ Delete User"):
                 if username and username != st.session_state["username"]: # Prevent deleting logged-in user
-                    # Unlink child before deleting user
-                    current_link = df_users[df_users['username'] == username]['child_link'].iloc[0] if username in df_users['username'].values else 'All'
-                    if current_link != 'All':
-                        upsert_child(current_link, "None")
-                        
                     delete_user(username)
                     st.warning(f"User '{username}' deleted.")
                     st.rerun()
@@ -88,55 +143,62 @@ def show_page():
     # --- TAB 2: CHILD PROFILES (Request 1) ---
     with tab2:
         st.header("Client Child Profiles")
-        df_children = get_list_data("children")
-        st.dataframe(df_children, use_container_width=True)
+        child_search = st.text_input("Search Children", placeholder="Name starts with...", key="children_query")
+        offset = page_offset("children_page", (child_search,), DIRECTORY_PAGE_SIZE)
+        df_children, total = _search_children(child_search, False, DIRECTORY_PAGE_SIZE, offset, directory_version)
+        st.dataframe(df_children.drop(columns=["id"]), width="stretch", hide_index=True)
+        show_pager("children_page", total, DIRECTORY_PAGE_SIZE)
+
+        # Choosing a profile outside the form lets the fields below show its current values
+        children = dict(zip(df_children["id"].tolist(), df_children["child_name"].tolist()))
+        selected_id = st.selectbox("Child Profile", [None, *children],
+                                   format_func=lambda c: children.get(c, "➕ New Child"))
+        selected = get_child_record(selected_id) if selected_id else None
+        parent_query = st.text_input("Find Parent Login", placeholder="Username starts with...", key="children_parent_query")
 
         with st.form("child_form"):
             st.subheader("Add / Edit / Delete Child Profile")
             col1, col2 = st.columns(2)
             
-            child_name = col1.text_input("Child Name (ID)", help="Must be unique.")
-            # Default to today, or the existing DOB if editing
-            existing_dob = df_children[df_children['child_name'] == child_name]['date_of_birth'].iloc[0] if child_name in df_children['child_name'].values else date.today().isoformat()
-            dob = col2.date_input("Date of Birth (Optional)", value=pd.to_datetime(existing_dob) if pd.notna(existing_dob) else date.today())
+            # Editing the name of an existing profile renames the child everywhere
+            child_name = col1.text_input("Child Name (ID)", value=selected["child_name"] if selected else "",
+                                         help="Must be unique.", key=f"child_name_{selected_id}")
+            existing_dob = selected["date_of_birth"] if selected else None
+            dob = col2.date_input("Date of Birth (Optional)", value=pd.to_datetime(existing_dob) if existing_dob else date.today(),
+                                  key=f"child_dob_{selected_id}")
             
-            # Get list of users with role 'parent' and ensure they are unassigned
-            parent_df = df_users[df_users["role"] == "parent"]
-            unassigned_parents = parent_df[parent_df["child_link"].isin(["All", "None"])]["username"].tolist()
-            
-            # Find current assigned parent
-            current_parent = df_children[df_children['child_name'] == child_name]['parent_username'].iloc[0] if child_name in df_children['child_name'].values else 'None/Unassigned'
+            # Parents without a linked child, plus this child's current parent
+            df_parents, matches = _search_users(parent_query, "parent", True, DIRECTORY_OPTION_LIMIT, 0, directory_version)
+            current_parent = selected["parent_username"] if selected else None
 
-            # Combine current parent with unassigned parents for the list
-            parent_list = ["None/Unassigned"] + sorted(list(set(unassigned_parents + [current_parent])))
-            
-            default_index = parent_list.index(current_parent) if current_parent in parent_list else 0
-            parent_link = st.selectbox("Assign Parent Login ID", parent_list, index=default_index)
+            parent_list = [None] + sorted(set(df_parents["username"].tolist() + ([current_parent] if current_parent else [])))
+            parent_link = st.selectbox("Assign Parent Login ID", parent_list, index=parent_list.index(current_parent),
+                                       format_func=lambda p: p or "None/Unassigned", key=f"child_parent_{selected_id}")
+            if matches > DIRECTORY_OPTION_LIMIT:
+                st.caption(f"Showing {DIRECTORY_OPTION_LIMIT} of {matches} unlinked parent logins; search above to narrow.")
             
             col3, col4 = st.columns(2)
             
             if col3.form_submit_button("💾 Save Child Profile"):
                 if child_name:
-                    final_parent = parent_link if parent_link != "None/Unassigned" else "None"
-                    
-                    # 1. Update/Insert Child record
-                    upsert_child(child_name, final_parent, dob.isoformat())
-                    
-                    # 2. Update the newly assigned parent's user record (if one was selected)
-                    if final_parent != "None":
-                        # We don't change the password here, just the link
-                        upsert_user(final_parent, None, "parent", child_name) 
-                        st.success(f"Child '{child_name}' saved and linked to parent '{final_parent}'.")
+                    try:
+                        child_id = upsert_child(child_name, dob.isoformat(), selected_id)
+                    except sqlite3.IntegrityError:
+                        st.error(f"Another child is already named '{child_name}'.")
                     else:
-                         st.success(f"Child '{child_name}' saved (no parent assigned).")
-                    st.rerun()
+                        set_child_parent(child_id, parent_link)
+                        if parent_link:
+                            st.success(f"Child '{child_name}' saved and linked to parent '{parent_link}'.")
+                        else:
+                            st.success(f"Child '{child_name}' saved (no parent assigned).")
+                        st.rerun()
                 else:
                     st.error("Child Name is required.")
                     
             if col4.form_submit_button("🗑️ Delete Child"):
-                if child_name:
-                    delete_child(child_name)
-                    st.warning(f"Child '{child_name}' deleted. Parent link removed.")
+                if selected_id:
+                    delete_child(selected_id)
+                    st.warning(f"Child '{selected['child_name']}' deleted. Parent link removed.")
                     st.rerun()
 
     # --- TAB 3: CUSTOM LISTS (Request 3) ---
@@ -145,44 +207,79 @@ def show_page():
         
         col_list_1, col_list_2 = st.columns(2)
         
-        # Discipline Management
         with col_list_1:
-            st.subheader("Disciplines")
-            df_d = get_list_data("disciplines")
-            st.dataframe(df_d, use_container_width=True)
-            
-            d_name = st.text_input("Discipline Name (Add/Delete)")
-            col_d1, col_d2 = st.columns(2)
-            
-            if col_d1.button("➕ Add Discipline"):
-                if d_name:
-                    upsert_list_item("disciplines", d_name)
-                    st.success(f"Discipline '{d_name}' added.")
-                    st.rerun()
-            
-            if col_d2.button("🗑️ Delete Discipline"):
-                if d_name:
-                    delete_list_item("disciplines", d_name)
-                    st.warning(f"Discipline '{d_name}' deleted.")
-                    st.rerun()
-
-        # Goal Area Management
+            _show_list_editor("disciplines", "Discipline", versions)
         with col_list_2:
-            st.subheader("Goal Areas")
-            df_g = get_list_data("goal_areas")
-            st.dataframe(df_g, use_container_width=True)
-            
-            g_name = st.text_input("Goal Area Name (Add/Delete)")
-            col_g1, col_g2 = st.columns(2)
+            _show_list_editor("goal_areas", "Goal Area", versions)
 
-            if col_g1.button("➕ Add Goal Area"):
-                if g_name:
-                    upsert_list_item("goal_areas", g_name)
-                    st.success(f"Goal Area '{g_name}' added.")
-                    st.rerun()
-                    
-            if col_g2.button("🗑️ Delete Goal Area"):
-                if g_name:
-                    delete_list_item("goal_areas", g_name)
-                    st.warning(f"Goal Area '{g_name}' deleted.")
-                    st.rerun()
+    # --- TAB 4: BULK IMPORT ---
+    with tab4:
+        st.header("Import Historical Data")
+        st.caption("CSV or XLSX with a header row. Progress rows are checked against the current children, "
+                   "disciplines and goal areas; invalid rows are skipped and listed below.")
+
+        import_table = st.selectbox("Import Into", IMPORT_TABLES,
+                                    format_func=lambda t: {"progress": "Progress Notes", "children": "Child Profiles",
+                                                           "session_plans": "Session Plans"}[t])
+        import_file_upload = st.file_uploader("Data File", type=["csv", "xlsx"], key="bulk_import_file")
+
+        if st.button("📥 Run Import", disabled=import_file_upload is None):
+            status = st.empty()
+            try:
+                summary = import_file(
+                    import_table, import_file_upload, import_file_upload.name,
+                    on_progress=lambda s: status.info(f"{s['rows']} rows read, {s['inserted']} inserted "
+                                                      f"({s['rows_per_second']:.0f} rows/s)...")
+                )
+            except Exception as e:
+                st.error(f"Import failed. Error: {e}")
+            else:
+                status.success(f"{summary['inserted']} of {summary['rows']} rows imported in {summary['seconds']:.2f}s "
+                               f"({summary['rows_per_second']:.0f} rows/s).")
+                if summary["error_count"]:
+                    st.warning(f"{summary['error_count']} rows were rejected.")
+                    st.dataframe(pd.DataFrame(summary["errors"], columns=["Line", "Problem"]), width="stretch")
+
+    # --- TAB 5: DIAGNOSTICS ---
+    with tab5:
+        st.header("Performance Diagnostics")
+        st.caption("Timings of database calls, media and export I/O, chart building and pages since the server "
+                   f"started (this process only). Calls slower than {instrumentation.SLOW_CALL_MS:.0f} ms are logged.")
+
+        col1, col2 = st.columns([3, 1])
+        enabled = col1.toggle("Record timings", value=instrumentation.is_enabled(),
+                              help="Applies to every session on this server.")
+        if enabled != instrumentation.is_enabled():
+            instrumentation.set_enabled(enabled)
+        if col2.button("🔄 Reset Statistics"):
+            instrumentation.reset()
+
+        stats, slow_calls = instrumentation.snapshot()
+        if not stats:
+            st.info("No timings recorded yet.")
+        else:
+            df_stats = pd.DataFrame([
+                {"Name": name, "Calls": s["calls"], "Mean (ms)": round(s["mean_ms"], 2), "~p95 (ms)": round(s["p95_ms"], 1),
+                 "Max (ms)": round(s["max_ms"], 1), "Total (s)": round(s["total_ms"] / 1000, 2),
+                 "Rows": s["rows"], "MB": round(s["bytes"] / 1e6, 2)}
+                for name, s in stats.items()
+            ]).sort_values("Total (s)", ascending=False)
+            st.dataframe(df_stats, width="stretch", hide_index=True)
+
+            selected = st.selectbox("Latency Histogram", df_stats["Name"].tolist())
+            labels = [f"≤{b:g} ms" if b != float("inf") else f">{instrumentation.BUCKETS_MS[-2]:g} ms"
+                      for b in instrumentation.BUCKETS_MS]
+            histogram = pd.DataFrame({"Calls": stats[selected]["histogram"]},
+                                     index=pd.CategoricalIndex(labels, categories=labels, ordered=True))
+            st.bar_chart(histogram)
+
+        st.subheader("Slow Calls")
+        if slow_calls:
+            st.dataframe(pd.DataFrame(slow_calls), width="stretch", hide_index=True)
+        else:
+            st.caption("None recorded.")
+
+    # --- TAB 6: MEDIA STORAGE ---
+    with tab6:
+        st.header("Media Storage")
+        show_media_panel()
@@ -0,0 +1,77 @@
+# views/analytics.py
+# Staff page comparing progress outcomes across session plan blocks and lead staff (see analytics.py).
+import streamlit as st
+import plotly.express as px
+from datetime import date, timedelta
+from instrumentation import timed
+from analytics import load_outcomes, compare_features, ALL_GOALS, MIN_SESSIONS
+from views.search import PLAN_BLOCK_LABELS
+
+COLUMN_CONFIG = {
+    "feature": st.column_config.TextColumn("With"),
+    "plan_days": st.column_config.NumberColumn("Plan Days"),
+    "sessions": st.column_config.NumberColumn("Sessions"),
+    "progress_rate": st.column_config.NumberColumn("Progress Rate", format="percent"),
+    "sessions_without": st.column_config.NumberColumn("Sessions Without"),
+    "progress_rate_without": st.column_config.NumberColumn("Progress Rate Without", format="percent"),
+    "progress_rate_difference": st.column_config.NumberColumn("Difference", format="percent"),
+    "mean_status": st.column_config.NumberColumn("Average Status (1-3)", format="%.2f"),
+    "mean_status_without": st.column_config.NumberColumn("Average Status Without", format="%.2f"),
+}
+
+def _show_comparison(df, label):
+    """Bar chart of the progress rate with and without each feature, and the figures behind it."""
+    if df.empty:
+        st.info(f"No progress entries fall on days with a session plan yet, so there is nothing to compare by {label}.")
+        return
+    chart = df.melt(id_vars="feature", value_vars=["progress_rate", "progress_rate_without"],
+                    var_name="days", value_name="rate")
+    chart["days"] = chart["days"].map({"progress_rate": f"With the {label}", "progress_rate_without": "Other plan days"})
+    fig = px.bar(chart, x="feature", y="rate", color="days", barmode="group",
+                 labels={"feature": label.title(), "rate": "Progress Rate", "days": ""})
+    fig.update_yaxes(tickformat=".0%", range=[0, 1])
+    st.plotly_chart(fig, width="stretch")
+
+    if not df["enough_data"].all():
+        st.caption(f"Rows marked ⚠️ have fewer than {MIN_SESSIONS} sessions on one side.")
+    table = df.assign(feature=df["feature"].where(df["enough_data"], "⚠️ " + df["feature"]))
+    st.dataframe(table[list(COLUMN_CONFIG)], column_config=COLUMN_CONFIG, width="stretch", hide_index=True)
+
+@timed("page.analytics")
+def show_page():
+    st.header("📈 Session Plan Outcomes")
+    st.info("Compares the progress entries logged on days whose session plan included a block or lead with "
+            "those on the other planned days. These are associations, not proof that the plan caused them.")
+
+    col1, col2 = st.columns(2)
+    all_time = col1.toggle("All Time", value=True, help="Reads the pre-computed totals; a date range is joined on request.")
+    date_range = col1.date_input("Period", value=(date.today() - timedelta(days=365), date.today()), disabled=all_time)
+    start_date, end_date = (None, None) if all_time or len(date_range) < 2 else date_range
+    by_goal = col2.toggle("Split by Goal Area", value=True)
+
+    outcomes = load_outcomes(start_date, end_date, by_goal)
+    if outcomes.empty:
+        st.info("No progress entries recorded yet.")
+        return
+    goal_areas = outcomes["goal_area"].drop_duplicates().tolist()
+    goal_area = col2.selectbox("Goal Area", goal_areas, disabled=not by_goal,
+                               index=goal_areas.index("Regulation") if "Regulation" in goal_areas else 0)
+    goal_outcomes = outcomes[outcomes["goal_area"] == (goal_area if by_goal else ALL_GOALS)]
+
+    planned = compare_features(goal_outcomes, "any", baseline="all")
+    if not planned.empty:
+        row = planned.iloc[0]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Days with a Session Plan", int(row["plan_days"]))
+        col2.metric("Progress Rate on Planned Days", f"{row['progress_rate']:.0%}",
+                    delta=f"{row['progress_rate_difference'] * 100:+.0f} pts vs unplanned days"
+                    if row["sessions_without"] else None)
+        col3.metric("Sessions on Planned Days", f"{int(row['sessions'])} of {int(row['sessions'] + row['sessions_without'])}")
+
+    tab1, tab2 = st.tabs(["🧩 Plan Blocks", "🧑‍🏫 Lead Staff"])
+    with tab1:
+        blocks = compare_features(goal_outcomes, "block:")
+        blocks["feature"] = blocks["feature"].map(PLAN_BLOCK_LABELS).fillna(blocks["feature"])
+        _show_comparison(blocks, "plan block")
+    with tab2:
+        _show_comparison(compare_features(goal_outcomes, "lead:"), "lead staff")
@@ -1,113 +1,245 @@
 # views/dashboard.py (UPDATED)
 import streamlit as st
+from instrumentation import timed, span
 import plotly.express as px
+from trends import build_trend, fold_new_rows, RESOLUTIONS
 import pandas as pd
-from database import get_data # Simple import works since database.py is now in 'views'
-import os 
+from database import get_data_versions, get_progress_snapshot, get_progress_since, get_progress_page, FEED_PAGE_SIZE
+from views.reference_data import get_reference_options, get_progress_child_options
+from views.export_panel import show_export_panel
+from views.reports_panel import show_reports_panel
+import os
 
+# --- Incremental aggregates: each session keeps its loaded daily frame and only reads newer rows ---
+
+def _load_aggregates(filters, version):
+    """Returns this session's dashboard aggregates, bringing them up to date as cheaply as possible.
+
+    Nothing is read while the progress version is unchanged. New entries are folded in by id; a full
+    snapshot is only taken for new filters or after progress rows were edited or deleted.
+    """
+    key = tuple(filters.items())
+    agg = st.session_state.get("dashboard_agg")
+    if agg is not None and agg["key"] == key and agg["version"] == version:
+        return agg
+
+    if agg is not None and agg["key"] == key:
+        rows, last_id, mutations = get_progress_since(agg["last_id"], **filters)
+        if mutations == agg["mutations"]:
+            agg.update(version=version, last_id=last_id)
+            if not rows.empty:
+                agg["daily"] = fold_new_rows(agg["daily"], rows)
+                agg["total"] += len(rows)
+                agg["progress_count"] += int((rows["status"] == "Progress").sum())
+                newest = rows.sort_values(["date", "id"]).iloc[-1]
+                if agg["latest"] is None or (newest["date"], newest["id"]) > agg["latest"][:2]:
+                    agg["latest"] = (newest["date"], int(newest["id"]), newest["status"])
+                agg["trends"] = {}
+            return agg
+
+    agg = get_progress_snapshot(**filters)
+    agg.update(key=key, version=version, trends={})
+    st.session_state["dashboard_agg"] = agg
+    return agg
+
+def _load_trend(agg, resolution):
+    """Builds the trend once per resolution for the session's current daily frame."""
+    if resolution not in agg["trends"]:
+        agg["trends"][resolution] = build_trend(agg["daily"], resolution)
+    return agg["trends"][resolution]
+
+@timed("page.dashboard")
 def show_page():
-    # Retrieve the child filter from the session state (set in app.py during login)
-    child_filter = st.session_state.get("child_link", "All")
+    # Retrieve the linked child from the session state (set in app.py during login)
     user_role = st.session_state.get("user_role", "guest")
+    child_id = st.session_state.get("child_id")
 
     # --- Header and Data Fetching ---
     if user_role == "parent":
-        st.header(f"🏡 My Child's Progress: {child_filter}")
+        if child_id is None:
+            st.warning("Your login is not linked to a child yet. Please contact the program administrator.")
+            return
+        st.header(f"🏡 My Child's Progress: {st.session_state.get('child_name')}")
         st.info("This dashboard displays progress data collected by our staff for your child only.")
     else:
         st.header("📊 Clinical Dashboard & Reports")
         st.info("Review program-wide progress or filter by individual child.")
-        
-    try:
-        df = get_data("progress")
-    except Exception as e:
-        st.error(f"Error loading progress data. Error: {e}")
-        return
 
-    if df.empty:
-        st.warning("No progress data recorded yet. Go to 'Progress Tracker' to add entries.")
-        return
+    # One lookup tells every cached loader below whether its data changed since the last rerun
+    versions = get_data_versions()
 
-    # --- Filtering Logic ---
-    if child_filter != "All":
-        # Parent View: Filter data for their specific child
-        df_display = df[df["child_name"] == child_filter].copy()
-        if df_display.empty:
-            st.warning(f"No progress data found for {child_filter}.")
-            return
-        selected_child = child_filter
-    else:
-        # Staff/Admin View: Selectbox Filter
-        df_display = df.copy() 
-        with st.expander("🔎 Filter Data", expanded=True):
-            child_list = ["All Children"] + sorted(df_display["child_name"].unique().tolist())
-            selected_child = st.selectbox("Select Child", child_list)
-        
-        if selected_child != "All Children":
-            df_display = df_display[df_display["child_name"] == selected_child]
-            
-        if df_display.empty:
-            st.warning(f"No progress data found for the selection: {selected_child}.")
-            return
+    # --- Filtering Logic (all filters are applied in SQL) ---
+    # Selectboxes hold ids (None = all); the names are only used for display
+    with st.expander("🔎 Filter Data", expanded=user_role != "parent"):
+        if user_role == "parent":
+            # Parent View: Locked to their specific child
+            selected_child = child_id
+            child_names = {child_id: st.session_state.get("child_name")}
+        else:
+            # Staff/Admin View: Selectbox Filter
+            try:
+                child_names = get_progress_child_options(versions["progress"])
+            except Exception as e:
+                st.error(f"Error loading progress data. Error: {e}")
+                return
+            selected_child = st.selectbox("Select Child", [None, *child_names],
+                                          format_func=lambda c: child_names.get(c, "All Children"))
+
+        col1, col2, col3 = st.columns(3)
+        date_range = col1.date_input("Date Range", value=(), help="Leave empty to include all dates.")
+        disciplines = get_reference_options("disciplines", versions)
+        discipline_id = col2.selectbox("Discipline", [None, *disciplines], format_func=lambda d: disciplines.get(d, "All"))
+        goal_areas = get_reference_options("goal_areas", versions)
+        goal_area_id = col3.selectbox("Goal Area", [None, *goal_areas], format_func=lambda g: goal_areas.get(g, "All"))
+
+    filters = {
+        "child_id": selected_child,
+        "start_date": date_range[0] if len(date_range) > 0 else None,
+        "end_date": date_range[1] if len(date_range) > 1 else None,
+        "discipline_id": discipline_id,
+        "goal_area_id": goal_area_id,
+    }
+
+    version = versions["progress"]
+    agg = _load_aggregates(filters, version)
+    if agg["total"] == 0:
+        if selected_child is not None:
+            st.warning(f"No progress data found for the selection: {child_names.get(selected_child)}.")
+        else:
+            st.warning("No progress data recorded yet. Go to 'Progress Tracker' to add entries.")
+        return
 
     # --- Display Metrics and Charts ---
-    
+
     st.divider()
-    
-    if selected_child == "All Children":
+
+    if selected_child is None:
         st.subheader("Program-Wide Metrics")
     else:
-        st.subheader(f"Key Progress Metrics for {selected_child}")
-        
+        st.subheader(f"Key Progress Metrics for {child_names.get(selected_child)}")
+
     m1, m2, m3 = st.columns(3)
-    
-    m1.metric("Total Sessions Logged", len(df_display))
-    progress_count = len(df_display[df_display["status"] == "Progress"])
-    success_rate = round((progress_count / len(df_display)) * 100) if len(df_display) > 0 else 0
-    m2.metric("Positive Progress Rate", f"{success_rate}%")
-    latest_status = df_display.sort_values(by="date", ascending=False).iloc[0]["status"] if not df_display.empty else "N/A"
-    m3.metric("Latest Recorded Status", latest_status)
+
+    m1.metric("Total Sessions Logged", agg["total"])
+    m2.metric("Positive Progress Rate", f"{round(agg['progress_count'] / agg['total'] * 100)}%")
+    m3.metric("Latest Recorded Status", agg["latest"][2])
 
     # CHARTS
     st.divider()
-    
+
     st.subheader(f"Goal Achievement Trend")
-    
-    status_map = {"Regression": 1, "Stable": 2, "Progress": 3}
-    # Use .loc to avoid SettingWithCopyWarning
-    df_display.loc[:, "numeric_status"] = df_display["status"].map(status_map)
-    
-    fig = px.line(df_display, x="date", y="numeric_status", color="goal_area",
-                  title="Status of Goals Over Time (1=Regression, 3=Progress)",
-                  markers=True)
-    
-    fig.update_layout(yaxis=dict(
-        tickvals=[1, 2, 3],
-        ticktext=["Regression", "Stable", "Progress"],
-        title="Performance Status"
-    ))
-    
-    st.plotly_chart(fig, use_container_width=True)
+
+    # Aggregated per goal per day/week/month and capped in points, so the chart scales with
+    # the date range rather than the number of progress rows
+    resolution = st.radio("Resolution", ["auto", *RESOLUTIONS], horizontal=True,
+                          format_func=lambda r: "Auto" if r == "auto" else RESOLUTIONS[r])
+    df_trend, used_resolution = _load_trend(agg, resolution)
+
+    # Chart building and serialization are timed separately from the data queries
+    with span("dashboard.chart"):
+        fig = px.line(df_trend, x="date", y="mean_status", color="goal_area",
+                      title=f"{RESOLUTIONS[used_resolution]} Average Status of Goals (1=Regression, 3=Progress)",
+                      markers=True, hover_data=["sessions"])
+        # Dotted rolling average per goal, sharing the goal's legend entry
+        for trace in list(fig.data):
+            goal_rows = df_trend[df_trend["goal_area"] == trace.name]
+            fig.add_scatter(x=goal_rows["date"], y=goal_rows["rolling_mean"], mode="lines", name=f"{trace.name} (rolling)",
+                            line=dict(dash="dot", color=trace.line.color), legendgroup=trace.name, showlegend=False,
+                            hoverinfo="skip")
+
+        fig.update_layout(yaxis=dict(
+            tickvals=[1, 2, 3],
+            ticktext=["Regression", "Stable", "Progress"],
+            title="Performance Status"
+        ))
+
+        st.plotly_chart(fig, width="stretch")
+
+    # Staff can export the progress rows behind the current filters (generated only on request)
+    if user_role != "parent":
+        with st.expander("📥 Export Progress Data"):
+            show_export_panel("progress", "Progress", **filters)
+        with st.expander("🖨️ Parent Meeting Reports"):
+            show_reports_panel(get_progress_child_options(version))
 
     # --- Recent Notes and Media Display ---
     st.subheader("Recent Notes & Media")
-    
-    # Iterate through the filtered data and display notes/media
-    for index, row in df_display.sort_values(by="date", ascending=False).head(50).iterrows():
-        st.markdown(f"**{row['date']}** | **{row['discipline']}** | **Goal:** {row['goal_area']} | **Status:** **{row['status']}**")
-        st.markdown(f"**Notes:** {row['notes']}")
-        
-        if pd.notna(row['media_path']) and row['media_path'] and os.path.exists(row['media_path']):
-            file_path = row['media_path']
-            # Get the file extension to determine the type
-            mime_type = os.path.splitext(file_path)[1].lower()
-            
-            with st.expander(f"View Attached Media ({os.path.basename(file_path)})"):
-                if mime_type in ['.jpg', '.jpeg', '.png']:
-                    st.image(file_path, caption="Therapist Media", use_column_width=True)
-                elif mime_type in ['.mp4', '.mov']:
-                    st.video(file_path, format="video/mp4")
-                else:
-                    st.warning(f"Media found but cannot display: {os.path.basename(file_path)}")
-            
-        st.markdown("---")
+    _show_feed(filters, version)
+
+def _load_feed(filters, version):
+    """Returns the session's feed state, starting over when the filters or the data change."""
+    feed_key = (tuple(filters.items()), version)
+    feed = st.session_state.get("feed")
+    if feed is None or feed["key"] != feed_key:
+        df_page, next_cursor = get_progress_page(**filters)
+        feed = {"key": feed_key, "pages": [df_page], "next": next_cursor}
+        st.session_state["feed"] = feed
+    return feed
+
+def _show_feed(filters, version):
+    """Renders the loaded feed pages; text is batched and media is only read when opened."""
+    feed = _load_feed(filters, version)
+    df_feed = pd.concat(feed["pages"], ignore_index=True)
+
+    # Build every entry's text in one vectorized pass
+    text = df_feed[["date", "discipline", "goal_area", "status", "notes"]].astype("string").fillna("")
+    entries = ("**" + text["date"] + "** | **" + text["discipline"] + "** | **Goal:** " + text["goal_area"]
+               + " | **Status:** **" + text["status"] + "**  \n**Notes:** " + text["notes"])
+    has_media = (df_feed["media_id"].notna() & df_feed["media_file"].notna()).tolist()
+
+    # Consecutive text-only entries share a single markdown element
+    pending = []
+    for i, entry in enumerate(entries):
+        pending.append(entry)
+        if has_media[i]:
+            st.markdown("\n\n---\n\n".join(pending))
+            pending = []
+            _show_media(df_feed.iloc[i])
+            st.markdown("---")
+    if pending:
+        st.markdown("\n\n---\n\n".join(pending) + "\n\n---")
+
+    if feed["next"] and st.button(f"⬇️ Load {FEED_PAGE_SIZE} More Entries"):
+        df_page, feed["next"] = get_progress_page(cursor=feed["next"], **filters)
+        feed["pages"].append(df_page)
+        st.rerun()
+
+def _show_media(row):
+    """Lazy media expander: nothing is read from disk until the user opens it."""
+    file_path = row['media_file']
+    mime_type = row['media_mime'] if pd.notna(row['media_mime']) else ""
+    size_mb = row['media_size'] / 1e6 if pd.notna(row['media_size']) else 0
+    thumb_path = row['thumb_path'] if pd.notna(row['thumb_path']) else ""
+    preview_path = row['preview_path'] if pd.notna(row['preview_path']) else ""
+    media_key = f"media_{row['id']}"
+
+    expander = st.expander(f"View Attached Media ({os.path.basename(file_path)}, {size_mb:.1f} MB)",
+                           key=media_key, on_change="rerun")
+    if not expander.open:
+        return
+
+    with expander:
+        if not os.path.exists(file_path):
+            st.warning(f"Media file is missing: {os.path.basename(file_path)}")
+            return
+        # Small thumbnail first; the preview and then the original are only sent when asked for
+        level = st.session_state.get(f"{media_key}_level", "thumb" if thumb_path else "preview")
+        if level == "preview" and not preview_path:
+            level = "original"
+        if level == "thumb":
+            st.image(thumb_path, caption="Therapist Media")
+            if st.button("🔍 View Full Media", key=f"{media_key}_full"):
+                st.session_state[f"{media_key}_level"] = "preview"
+                st.rerun()
+            return
+
+        source = preview_path if level == "preview" else file_path
+        if mime_type.startswith("image/"):
+            st.image(source, caption="Therapist Media", width="stretch")
+        elif mime_type.startswith("video/"):
+            st.video(source, format="video/mp4" if level == "preview" else mime_type)
+        else:
+            st.warning(f"Media found but cannot display: {os.path.basename(file_path)}")
+        if level == "preview" and st.button("Load Original", key=f"{media_key}_original"):
+            st.session_state[f"{media_key}_level"] = "original"
+            st.rerun()
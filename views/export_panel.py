@@ -0,0 +1,39 @@
+# views/export_panel.py
+# Shared export controls for the planner and dashboard. The file is generated by a background job
+# (see jobs.py) when the user clicks "Prepare", never on an ordinary rerun; the latest export per
+# user and table is looked up from the job table, so it is still there after navigating away.
+import os
+import streamlit as st
+from datetime import date
+from exports import FORMATS, parquet_available
+import jobs
+from views.job_panel import show_job
+
+def _show_download(job, label):
+    """Download button for a finished export, while its file is still there."""
+    result = job["result"]
+    if os.path.exists(result["path"]):
+        fmt_info = FORMATS[result["fmt"]]
+        with open(result["path"], "rb") as f:
+            st.download_button(
+                label=f"📥 Download {label} ({result['rows']} rows)",
+                data=f,
+                file_name=f"TILP_{label.replace(' ', '_')}_{date.today().isoformat()}.{fmt_info['extension']}",
+                mime=fmt_info["mime"],
+                key=f"export_{job['id']}_download",
+            )
+
+def show_export_panel(table_name, label, **filters):
+    """Renders format choice, a 'Prepare' button and the status or download of the latest export."""
+    state_key = f"export_{table_name}"
+    owner = st.session_state.get("username")
+    formats = [f for f in FORMATS if f != "parquet" or parquet_available()]
+
+    col1, col2 = st.columns(2)
+    fmt = col1.selectbox("Export Format", formats, format_func=lambda f: FORMATS[f]["label"], key=f"{state_key}_format")
+    col2.write("")
+    if col2.button(f"⚙️ Prepare {label} Export", key=f"{state_key}_prepare"):
+        jobs.submit("export", {"table_name": table_name, "fmt": fmt, **filters}, owner=owner)
+
+    show_job(jobs.latest_job(owner, "export", table_name=table_name), f"{label} export",
+             lambda job: _show_download(job, label))
@@ -0,0 +1,32 @@
+# views/job_panel.py
+# Status display shared by the panels that start background jobs (exports, reports, media cleanup,
+# see jobs.py). While a job is queued or running only this part of the page reruns to poll it; once
+# it is done a full rerun lets the panel render the result along with the rest of the page.
+import streamlit as st
+import jobs
+
+JOB_POLL_SECONDS = 2
+
+def _show_status(job, label, show_result):
+    if job["status"] in jobs.ACTIVE_STATUSES:
+        st.info(f"⏳ {label} is {job['status']} (started {job['created_at'].replace('T', ' ')})...")
+    elif job["status"] == "failed":
+        st.error(f"{label} failed. Error: {job['error']}")
+    else:
+        show_result(job)
+
+def show_job(job, label, show_result):
+    """Shows a job's progress (polling it while it runs), its error, or `show_result(job)` once it is done."""
+    if job is None:
+        return
+    if job["status"] not in jobs.ACTIVE_STATUSES:
+        _show_status(job, label, show_result)
+        return
+
+    @st.fragment(run_every=JOB_POLL_SECONDS)
+    def poll():
+        current = jobs.job_status(job["id"])
+        if current is None or current["status"] not in jobs.ACTIVE_STATUSES:
+            st.rerun()
+        _show_status(current, label, show_result)
+    poll()
@@ -0,0 +1,74 @@
+# views/media_panel.py
+# Media storage for the admin page: usage per storage tier, and the lifecycle job (see
+# media_lifecycle.py and jobs.py) that previews or runs orphan cleanup, compression and archiving
+# of old media, then reports the space it reclaimed.
+import pandas as pd
+import streamlit as st
+from database import get_media_storage_summary
+import media_lifecycle
+import jobs
+from views.job_panel import show_job
+
+def _mb(size_bytes):
+    return f"{size_bytes / 1e6:,.1f} MB"
+
+def _show_result(job):
+    """Shows what a finished lifecycle job found and reclaimed."""
+    result = job["result"]
+    orphans, compressed, archived = result["orphans"], result["compressed"], result["archived"]
+    finished = job["finished_at"].replace("T", " ")
+    st.caption(f"{'Preview' if result['dry_run'] else 'Cleanup'} finished {finished}.")
+
+    col1, col2, col3, col4 = st.columns(4)
+    if result["dry_run"]:
+        col1.metric("Reclaimable Now", _mb(result["reclaimed_bytes"]), help="Orphaned files plus media to archive.")
+        col3.metric("To Compress", compressed["files"], help=f"{_mb(compressed['candidate_bytes'])} before compression")
+    else:
+        col1.metric("Reclaimed", _mb(result["reclaimed_bytes"]))
+        col3.metric("Compressed", compressed["files"], help=f"{_mb(compressed['bytes'])} saved")
+    col2.metric("Orphaned Files", orphans["files"], help=f"{_mb(orphans['bytes'])} in files, "
+                                                          f"{orphans['records']} unlinked media records")
+    if archived.get("disabled"):
+        col4.metric("Archived", "Off", help="Set TILP_MEDIA_ARCHIVE_DIR to enable archiving.")
+    else:
+        col4.metric("To Archive" if result["dry_run"] else "Archived", archived["files"], help=_mb(archived["bytes"]))
+
+    errors = orphans["errors"] + compressed["errors"] + archived["errors"]
+    if errors:
+        with st.expander(f"⚠️ {len(errors)} files could not be processed"):
+            st.text("\n".join(errors))
+
+def show_media_panel():
+    """Renders storage usage, the age settings, 'Preview' and 'Run' buttons and the latest lifecycle job."""
+    owner = st.session_state.get("username")
+
+    summary = get_media_storage_summary()
+    if summary:
+        st.dataframe(pd.DataFrame([
+            {"Tier": tier.title(), "Files": s["files"], "Size": _mb(s["bytes"]), "As Uploaded": _mb(s["original_bytes"])}
+            for tier, s in summary.items()
+        ]), width="stretch", hide_index=True)
+    else:
+        st.info("No media has been uploaded yet.")
+
+    col1, col2 = st.columns(2)
+    compress_days = col1.number_input("Compress Media Older Than (days)", min_value=1,
+                                      value=media_lifecycle.COMPRESS_AFTER_DAYS, key="media_compress_days")
+    archive_days = col2.number_input("Archive Media Older Than (days)", min_value=1,
+                                     value=media_lifecycle.ARCHIVE_AFTER_DAYS, key="media_archive_days",
+                                     disabled=not media_lifecycle.ARCHIVE_DIR,
+                                     help=f"Moved to {media_lifecycle.ARCHIVE_DIR}" if media_lifecycle.ARCHIVE_DIR
+                                     else "Set TILP_MEDIA_ARCHIVE_DIR to enable archiving.")
+    st.caption(f"Files no progress entry uses are deleted once they are {media_lifecycle.ORPHAN_GRACE_HOURS} hours old. "
+               f"Each run compresses and archives at most {media_lifecycle.LIFECYCLE_BATCH_SIZE} files.")
+
+    job = jobs.latest_job(owner, "media_lifecycle")
+    running = job is not None and job["status"] in jobs.ACTIVE_STATUSES
+    col3, col4 = st.columns(2)
+    for column, label, dry_run in ((col3, "🔎 Preview Cleanup", True), (col4, "🧹 Run Cleanup", False)):
+        if column.button(label, key=f"media_lifecycle_{dry_run}", disabled=running):
+            jobs.submit("media_lifecycle", {"dry_run": dry_run, "compress_after_days": int(compress_days),
+                                            "archive_after_days": int(archive_days)}, owner=owner)
+            st.rerun()
+
+    show_job(job, "Media cleanup", _show_result)
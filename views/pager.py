@@ -0,0 +1,29 @@
+# views/pager.py
+# Previous/Next paging for the tables and result lists that are read one page at a time
+# (the admin user and child directories, the search results). The current page lives in
+# session_state under the caller's key.
+import streamlit as st
+
+def page_offset(key, filters, page_size):
+    """Row offset of the current page; a new search or filter starts again at page one."""
+    if st.session_state.get(f"{key}_filters") != filters:
+        st.session_state[f"{key}_filters"] = filters
+        st.session_state[key] = 0
+    return st.session_state[key] * page_size
+
+def show_pager(key, total, page_size, noun="total"):
+    """Shows Previous/Next buttons under a paged list; clicking moves the page and reruns."""
+    pages = max(1, -(-total // page_size))
+    page = st.session_state.get(key, 0)
+    if page >= pages:
+        # Deletions can leave the current page past the end
+        st.session_state[key] = pages - 1
+        st.rerun()
+    col1, col2, col3 = st.columns([1, 2, 1])
+    col2.caption(f"Page {page + 1} of {pages} · {total} {noun}")
+    if col1.button("◀ Previous", key=f"{key}_prev", disabled=page == 0):
+        st.session_state[key] = page - 1
+        st.rerun()
+    if col3.button("Next ▶", key=f"{key}_next", disabled=page >= pages - 1):
+        st.session_state[key] = page + 1
+        st.rerun()
@@ -1,9 +1,11 @@
 # views/planner.py (UPDATED for import fix)
 import streamlit as st
+from instrumentation import timed
 from datetime import date
-from database import save_plan, get_data # Simple import works since database.py is now in 'views'
-import pandas as pd
+from database import save_plan, get_session_plans
+from views.export_panel import show_export_panel
 
+@timed("page.planner")
 def show_page():
     st.header("📅 Daily Session Plan")
     st.info("Plan the structure of the daily session.")
@@ -79,19 +81,20 @@ def show_page():
     st.subheader("🗓️ All Daily Plans")
     
     try:
-        df_plans = get_data("session_plans")
-        st.dataframe(df_plans.sort_values(by="date", ascending=False), use_container_width=True)
+        df_plans = get_session_plans()
+        st.dataframe(df_plans, width="stretch")
         
-        # Export function
+        # Export function (streamed from SQLite only when requested)
         if not df_plans.empty:
-            csv_export = df_plans.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Export Session Plans to CSV",
-                data=csv_export,
-                file_name=f'TILP_Session_Plans_{date.today().isoformat()}.csv',
-                mime='text/csv',
-                help="Download all session plan data as a CSV file."
-            )
-        
+            with st.expander("📥 Export Session Plans"):
+                export_range = st.date_input("Export Date Range", value=(), key="plan_export_range",
+                                             help="Leave empty to export all session plans.")
+                show_export_panel(
+                    "session_plans",
+                    "Session Plans",
+                    start_date=export_range[0] if len(export_range) > 0 else None,
+                    end_date=export_range[1] if len(export_range) > 1 else None,
+                )
+
     except Exception as e:
         st.warning(f"No session plans saved yet or error loading data: {e}")
@@ -0,0 +1,39 @@
+# views/reference_data.py
+# Cached reference lists (children, disciplines, goal_areas, users) shared by every session.
+# Each cache entry is keyed by the table's data version, which the database triggers bump on
+# every insert/update/delete (upsert_child, delete_child, upsert_list_item, delete_list_item,
+# upsert_user, delete_user, ...), so a write invalidates exactly the lists it touched.
+import streamlit as st
+from database import get_list_data, get_data_versions, get_progress_children, REFERENCE_TABLES
+
+# Upper bound on staleness if the database is written by another process (e.g. a CLI import)
+REFERENCE_TTL_SECONDS = 600
+
+@st.cache_data(ttl=REFERENCE_TTL_SECONDS, max_entries=4 * len(REFERENCE_TABLES), show_spinner=False)
+def _load_table(table_name, version):
+    return get_list_data(table_name)
+
+def get_reference_table(table_name, versions=None):
+    """Returns the cached DataFrame for a reference table.
+
+    Pass `versions` (from get_data_versions()) when reading several tables in one rerun to share a
+    single version lookup.
+    """
+    if table_name not in REFERENCE_TABLES:
+        raise ValueError(f"Unknown reference table: {table_name}")
+    versions = versions if versions is not None else get_data_versions()
+    return _load_table(table_name, versions.get(table_name, 0))
+
+def get_reference_list(table_name, column="name", versions=None):
+    """Returns one column of a cached reference table as a list (e.g. disciplines -> names)."""
+    return get_reference_table(table_name, versions)[column].tolist()
+
+def get_reference_options(table_name, versions=None):
+    """Returns {id: name} for a cached reference list, for selectboxes that store the id."""
+    df = get_reference_table(table_name, versions)
+    return dict(zip(df["id"].tolist(), df["child_name" if table_name == "children" else "name"].tolist()))
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_progress_child_options(version):
+    """Returns the cached {id: name} of the children with progress entries, keyed by the progress data version."""
+    return get_progress_children()
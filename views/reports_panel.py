@@ -0,0 +1,46 @@
+# views/reports_panel.py
+# Parent meeting reports for the dashboard: staff pick children and a date range, a background job
+# (see jobs.py and reports.py) renders one report per child, and the panel offers the whole
+# caseload as a zip plus each child's file. Unchanged children reuse their cached report.
+import os
+import streamlit as st
+from datetime import date, timedelta
+from reports import FORMATS, pdf_available
+import jobs
+from views.job_panel import show_job
+
+DEFAULT_REPORT_DAYS = 90
+
+def _show_downloads(job):
+    """Download buttons for a finished report job: the caseload zip and each child's report."""
+    result = job["result"]
+    if not os.path.exists(result["zip"]):
+        return
+    cached = sum(report["cached"] for report in result["reports"])
+    st.caption(f"{len(result['reports'])} reports ({cached} unchanged since they were last generated).")
+    with open(result["zip"], "rb") as f:
+        st.download_button("📦 Download All Reports (zip)", data=f, file_name=os.path.basename(result["zip"]),
+                           mime="application/zip", key=f"reports_{job['id']}_zip")
+    cols = st.columns(3)
+    for i, report in enumerate(result["reports"]):
+        if os.path.exists(report["path"]):
+            with open(report["path"], "rb") as f:
+                cols[i % 3].download_button(f"📄 {report['child']}", data=f, file_name=os.path.basename(report["path"]),
+                                            mime=FORMATS[result["fmt"]], key=f"reports_{job['id']}_{i}")
+
+def show_reports_panel(children):
+    """Renders child ({id: name}) and date range selection, a 'Generate' button and the latest report job."""
+    owner = st.session_state.get("username")
+    formats = [f for f in FORMATS if f != "pdf" or pdf_available()]
+
+    selected = st.multiselect("Children", list(children), default=list(children), format_func=children.get,
+                              key="reports_children")
+    col1, col2 = st.columns(2)
+    date_range = col1.date_input("Report Period", value=(date.today() - timedelta(days=DEFAULT_REPORT_DAYS), date.today()),
+                                 key="reports_period")
+    fmt = col2.selectbox("Report Format", formats, format_func=str.upper, key="reports_format")
+    if st.button("🖨️ Generate Reports", key="reports_generate", disabled=not selected or len(date_range) < 2):
+        jobs.submit("reports", {"child_ids": selected, "start_date": date_range[0].isoformat(),
+                                "end_date": date_range[1].isoformat(), "fmt": fmt}, owner=owner)
+
+    show_job(jobs.latest_job(owner, "reports"), "Report generation", _show_downloads)
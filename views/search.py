@@ -0,0 +1,73 @@
+# views/search.py
+import re
+import streamlit as st
+from instrumentation import timed
+from views.pager import page_offset, show_pager
+from views.reference_data import get_progress_child_options
+from database import (search_progress_notes, search_session_plans, get_data_version,
+                      HIGHLIGHT_START, HIGHLIGHT_END, SEARCH_PAGE_SIZE)
+
+PLAN_BLOCK_LABELS = {
+    "warm_up": "Warm-Up",
+    "learning_block": "Learning Block",
+    "regulation_break": "Regulation Break",
+    "social_play": "Social Play",
+    "closing_routine": "Closing Routine",
+    "internal_notes": "Internal Notes",
+}
+
+_MARKDOWN_SPECIALS = re.compile(r"([\\`*_{}\[\]()#+\-.!|<>$~:])")
+
+def _highlighted(snippet):
+    """Escapes a search snippet for markdown and renders the matched terms in bold."""
+    text = _MARKDOWN_SPECIALS.sub(r"\\\1", (snippet or "").replace("\n", " "))
+    return text.replace(HIGHLIGHT_START, "**").replace(HIGHLIGHT_END, "**")
+
+@timed("page.search")
+def show_page():
+    user_role = st.session_state.get("user_role", "guest")
+
+    st.header("🔍 Search Notes & Plans")
+    st.info("Find progress notes and session plans by the words they contain, best matches first.")
+
+    col1, col2 = st.columns([3, 1])
+    text = col1.text_input("Search", placeholder="e.g. visual schedule")
+    if user_role == "parent":
+        # Parent View: only their own child's notes
+        child = st.session_state.get("child_id")
+        if child is None:
+            st.warning("Your login is not linked to a child yet. Please contact the program administrator.")
+            return
+    else:
+        children = get_progress_child_options(get_data_version())
+        child = col2.selectbox("Child", [None, *children], format_func=lambda c: children.get(c, "All Children"))
+
+    if not text.strip():
+        return
+
+    # Session plans are internal staff documents, so parents only search progress notes
+    sections = ["notes"] if user_role == "parent" else ["notes", "plans"]
+    tabs = st.tabs(["📝 Progress Notes", "📅 Session Plans"][:len(sections)])
+
+    with tabs[0]:
+        offset = page_offset("notes_page", (text, child), SEARCH_PAGE_SIZE)
+        df_notes, total = search_progress_notes(text, child_id=child, offset=offset)
+        if total == 0:
+            st.warning("No progress notes match your search.")
+        else:
+            for row in df_notes.itertuples():
+                st.markdown(f"**{row.date}** · {row.child_name} · {row.discipline} · {row.goal_area} "
+                            f"· *{row.status}*  \n{_highlighted(row.snippet)}")
+            show_pager("notes_page", total, SEARCH_PAGE_SIZE, "matches")
+
+    if "plans" in sections:
+        with tabs[1]:
+            offset = page_offset("plans_page", (text, child), SEARCH_PAGE_SIZE)
+            df_plans, total = search_session_plans(text, offset=offset)
+            if total == 0:
+                st.warning("No session plans match your search.")
+            else:
+                for row in df_plans.itertuples():
+                    st.markdown(f"**{row.date}** · {row.lead_staff} · {PLAN_BLOCK_LABELS.get(row.block, '')}  \n"
+                                f"{_highlighted(row.snippet)}")
+                show_pager("plans_page", total, SEARCH_PAGE_SIZE, "matches")
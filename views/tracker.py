@@ -1,22 +1,29 @@
 # views/tracker.py (UPDATED)
 import streamlit as st
-from database import save_progress, get_list_data # Simple import works since database.py is now in 'views'
+from instrumentation import timed
+from database import save_progress, save_progress_batch, get_data_versions, STATUS_SCORES
+from views.reference_data import get_reference_options
+import jobs
+import media_store
 from datetime import date
-import os
-import uuid # For creating unique filenames
+import pandas as pd
 
-# You must have a folder named 'media' in the root directory for this to work
-MEDIA_DIR = "media" 
+MEDIA_TYPES = ['jpg', 'jpeg', 'png', 'mp4', 'mov']
+BATCH_COLUMNS = ["Child", "Goal Area", "Status", "Notes", "Media"]
 
+@timed("page.tracker")
 def show_page():
     st.header("📝 Client Progress Tracker")
     st.info("Log daily outcomes for clients here.")
 
     # --- DYNAMIC LISTS ---
     try:
-        children = get_list_data("children")["child_name"].tolist()
-        disciplines = get_list_data("disciplines")["name"].tolist()
-        goal_areas = get_list_data("goal_areas")["name"].tolist()
+        # Cached across sessions; one version lookup replaces three table reads per rerun.
+        # Each list maps id -> name: the selectboxes show names and progress stores the ids.
+        versions = get_data_versions()
+        children = get_reference_options("children", versions)
+        disciplines = get_reference_options("disciplines", versions)
+        goal_areas = get_reference_options("goal_areas", versions)
     except Exception as e:
         st.error(f"Error loading lists from database. Ensure you ran init_db() and your database.py is updated. Error: {e}")
         return
@@ -25,47 +32,154 @@ def show_page():
         st.warning("No children found. Please add children in 'Admin Tools' first.")
         return
 
+    mode = st.radio("Entry Mode", ["Single Entry", "Group Session"], horizontal=True,
+                    help="Group Session logs several children and goals at once and saves them together.")
+    if mode == "Group Session":
+        _show_batch_entry(children, disciplines, goal_areas)
+        return
+
     # Form to capture all progress inputs
     with st.form("progress_form"):
         col1, col2 = st.columns(2)
         
         with col1:
             date_input = st.date_input("Date", date.today())
-            child = st.selectbox("Child Name", children)
-            discipline = st.selectbox("Discipline", disciplines)
+            child_id = st.selectbox("Child Name", list(children), format_func=children.get)
+            discipline_id = st.selectbox("Discipline", list(disciplines), format_func=disciplines.get)
         
         with col2:
-            goal_area = st.selectbox("Goal Area", goal_areas)
+            goal_area_id = st.selectbox("Goal Area", list(goal_areas), format_func=goal_areas.get)
             status = st.select_slider("Performance Status", options=["Regression", "Stable", "Progress"], value="Stable")
         
         notes = st.text_area("Anecdotal Notes", placeholder="e.g., Used spoon independently for 3 scoops...")
         
         # --- MEDIA UPLOAD (Request 4) ---
         media_file = st.file_uploader("Upload Photo/Video (Optional)", 
-                                      type=['jpg', 'jpeg', 'png', 'mp4', 'mov'], 
+                                      type=MEDIA_TYPES, 
                                       help="Attach a photo or short video clip for the parent to view.")
         
         submitted = st.form_submit_button("💾 Save Entry")
         
         if submitted:
             media_path = ""
+            media_id = None
             if media_file is not None:
-                if not os.path.exists(MEDIA_DIR):
-                    os.makedirs(MEDIA_DIR)
-                    
-                file_extension = media_file.name.split('.')[-1]
-                unique_filename = f"{uuid.uuid4()}.{file_extension}"
-                media_path = os.path.join(MEDIA_DIR, unique_filename)
-                
-                # Write the file content to disk
+                # Streamed to disk in chunks and stored once per unique file content
                 try:
-                    with open(media_path, "wb") as f:
-                        f.write(media_file.getbuffer())
+                    media = media_store.save_upload(media_file)
+                    media_path, media_id = media["path"], media["id"]
                     st.success(f"File saved.")
+                except media_store.MediaTooLargeError as e:
+                    st.error(str(e))
                 except Exception as e:
-                    st.error(f"Could not save file. Ensure the '{MEDIA_DIR}' folder is writable. Error: {e}")
-                    media_path = "" # Clear path if save failed
+                    st.error(f"Could not save file. Ensure the '{media_store.MEDIA_DIR}' folder is writable. Error: {e}")
             
             # Save the record to the database
-            save_progress(date_input.isoformat(), child, discipline, goal_area, status, notes, media_path)
-            st.success(f"Progress data saved for {child}!")
+            progress_id = save_progress(date_input.isoformat(), child_id, discipline_id, goal_area_id, status, notes, media_path, media_id)
+            if media_path:
+                # Thumbnail/preview generation runs as a background job so the submit returns immediately
+                jobs.submit("media_derivatives", {"progress_id": progress_id, "media_path": media_path},
+                            owner=st.session_state.get("username"))
+            st.success(f"Progress data saved for {children[child_id]}!")
+
+def _validate_batch(df, children, goal_areas):
+    """Returns (entries, errors) for the edited grid; blank rows are ignored.
+
+    The grid holds names; entries carry the matching child and goal area ids.
+    """
+    child_ids = {name: child_id for child_id, name in children.items()}
+    goal_ids = {name: goal_id for goal_id, name in goal_areas.items()}
+    entries, errors = [], []
+    for number, row in enumerate(df.itertuples(index=False), start=1):
+        child, goal, status, notes, media = row
+        if not any(isinstance(v, str) and v.strip() for v in (child, goal, notes)):
+            continue
+        if child not in child_ids:
+            errors.append(f"Row {number}: choose a child.")
+        elif goal not in goal_ids:
+            errors.append(f"Row {number}: choose a goal area for {child}.")
+        elif status not in STATUS_SCORES:
+            errors.append(f"Row {number}: choose a status for {child}.")
+        else:
+            entries.append({"child_id": child_ids[child], "goal_area_id": goal_ids[goal], "status": status,
+                            "notes": notes if isinstance(notes, str) else "", "media": media if isinstance(media, str) else None})
+    return entries, errors
+
+def _show_batch_entry(children, disciplines, goal_areas):
+    """Grid entry for a group session: one row per child and goal, all saved in a single transaction."""
+    # Bumped after every save: the widgets below are keyed on it, so the grid starts empty again
+    # and a second click cannot save the same rows twice
+    entry_round = st.session_state.setdefault("batch_round", 0)
+    if "batch_saved" in st.session_state:
+        st.success(st.session_state.pop("batch_saved"))
+
+    col1, col2 = st.columns(2)
+    batch_date = col1.date_input("Session Date", date.today(), key="batch_date")
+    discipline_id = col2.selectbox("Discipline", list(disciplines), format_func=disciplines.get, key="batch_discipline")
+    group = st.multiselect("Children in this Session", list(children.values()), key=f"batch_children_{entry_round}")
+    goals = st.multiselect("Goals Worked On", list(goal_areas.values()), key=f"batch_goals_{entry_round}")
+    media_files = st.file_uploader("Photos/Videos from the Session (Optional)", type=MEDIA_TYPES,
+                                   accept_multiple_files=True, key=f"batch_media_{entry_round}",
+                                   help="Attach a file to an entry by choosing it in the Media column.")
+    media_by_name = {f.name: f for f in media_files or []}
+
+    # One row per selected child and goal; rows can still be added, removed or changed in the grid
+    rows = pd.DataFrame([{"Child": c, "Goal Area": g, "Status": "Stable", "Notes": "", "Media": None}
+                         for c in group for g in goals], columns=BATCH_COLUMNS)
+
+    # Edits stay in the browser until the form is submitted, so filling the grid causes no reruns
+    with st.form(f"batch_progress_form_{entry_round}"):
+        edited = st.data_editor(
+            rows,
+            num_rows="dynamic",
+            hide_index=True,
+            width="stretch",
+            column_config={
+                "Child": st.column_config.SelectboxColumn(options=list(children.values()), required=True),
+                "Goal Area": st.column_config.SelectboxColumn(options=list(goal_areas.values()), required=True),
+                "Status": st.column_config.SelectboxColumn(options=list(STATUS_SCORES), required=True, default="Stable"),
+                "Notes": st.column_config.TextColumn(width="large"),
+                "Media": st.column_config.SelectboxColumn(options=list(media_by_name)),
+            },
+        )
+        submitted = st.form_submit_button("💾 Save All Entries")
+
+    if not submitted:
+        return
+    entries, errors = _validate_batch(edited[BATCH_COLUMNS], children, goal_areas)
+    if errors:
+        st.error("Nothing was saved. Please fix these rows:\n\n" + "\n".join(f"- {e}" for e in errors))
+        return
+    if not entries:
+        st.warning("Add at least one row before saving.")
+        return
+
+    # Each attached file is stored once, even if several entries share it
+    names = {e["media"] for e in entries if e["media"]}
+    if names - media_by_name.keys():
+        st.error(f"Nothing was saved. These files are no longer uploaded: {', '.join(names - media_by_name.keys())}")
+        return
+    stored = {}
+    try:
+        for name in names:
+            stored[name] = media_store.save_upload(media_by_name[name])
+    except media_store.MediaTooLargeError as e:
+        st.error(f"Nothing was saved. {e}")
+        return
+    except Exception as e:
+        st.error(f"Nothing was saved. Could not store media in '{media_store.MEDIA_DIR}'. Error: {e}")
+        return
+
+    for entry in entries:
+        media = stored.get(entry.pop("media"))
+        entry.update(date=batch_date.isoformat(), discipline_id=discipline_id,
+                     media_path=media["path"] if media else "", media_id=media["id"] if media else None)
+    progress_ids = save_progress_batch(entries)
+
+    for progress_id, entry in zip(progress_ids, entries):
+        if entry["media_path"]:
+            jobs.submit("media_derivatives", {"progress_id": progress_id, "media_path": entry["media_path"]},
+                        owner=st.session_state.get("username"))
+    st.session_state["batch_saved"] = f"Saved {len(entries)} entries for {len({e['child_id'] for e in entries})} children."
+    st.session_state["batch_round"] = entry_round + 1
+    st.rerun()